@@ -2,21 +2,36 @@
 HAKIKI AI v2.0 - Unified Audit API
 Complete API with Phase 2/3/4 endpoints: Graph, ML, PDF, and Sentinel.
 """
-from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Union
+import asyncio
+import io
+import json
 from app.core.graph_db import InMemoryGraph
 from app.services.ml_engine import AnomalyDetector
-from app.services.oracle import WhistleblowerOracle
-from app.services.pdf_generator import StopOrderGenerator
+from app.services.oracle import WhistleblowerOracle, oracle_cache
+from app.services.llm_client import ollama_client
+from app.services.stop_order_batch import stop_order_batch
+from app.services.stop_order_archive import stop_order_archive
 from app.services.sentinel_fog import SentinelFogNode
+from app.services.sentinel_pool import sentinel_pool, SentinelSaturatedError
+from app.services.station_registry import station_registry
+from app.services.geofence_audit import geofence_auditor
+from app.services.attendance_store import attendance_store
+from app.services.replay_guard import replay_index
+from app.services.edge_sync import sync_ledger, BundleError
+from app.utils.name_index import payroll_name_index
 from app.core.config import settings
 import pandas as pd
 import os
 
 router = APIRouter()
 
+# Largest tip batch accepted by /oracle/batch
+MAX_ORACLE_BATCH = 100_000
+
 # Initialize Services
 graph_db = InMemoryGraph()
 ml_engine = AnomalyDetector()
@@ -34,6 +49,25 @@ class StopOrderRequest(BaseModel):
     fraud_reason: Optional[str] = "Salary Padding - Statistical anomaly detected by ML analysis"
 
 
+class OracleTip(BaseModel):
+    """A single tip in a batch, with an optional caller-side ID."""
+    id: Optional[str] = None
+    text: str
+
+
+class OracleBatchRequest(BaseModel):
+    """Request model for batch tip analysis."""
+    tips: List[Union[OracleTip, str]]
+    use_llm: bool = True
+    resolve_names: bool = False  # Add payroll_matches per tip
+
+
+class BulkStopOrderRequest(BaseModel):
+    """Request model for bulk Stop Orders: explicit suspects and/or an /analyze-ml result."""
+    suspects: List[StopOrderRequest] = []
+    audit_result: Optional[dict] = None
+
+
 # ============ PHASE 2/3: CORE AUDIT ============
 
 @router.post("/run")
@@ -69,6 +103,8 @@ def run_audit(version: str = "v2"):
         
         # 1. Load Graph & Find Ghost Families
         graph_db.load_data(df)
+        station_registry.load_from_payroll(df)
+        payroll_name_index.load(df, source=dataset_path)
         ghosts = graph_db.get_ghost_families()
         stats = graph_db.get_stats()
         
@@ -146,9 +182,66 @@ def get_viz():
 
 
 @router.post("/oracle")
-def ask_oracle(payload: dict):
+async def ask_oracle(payload: dict):
     """Analyze whistleblower tip using LLM Oracle."""
-    return WhistleblowerOracle.analyze_tip(payload.get("text", ""))
+    return await WhistleblowerOracle.analyze_tip(payload.get("text", ""))
+
+
+@router.post("/oracle/batch")
+async def ask_oracle_batch(request: OracleBatchRequest):
+    """
+    Analyze many whistleblower tips; results stream back as NDJSON in completion order.
+    Each line carries `index` (position in the request) and the tip's `id` if given.
+    """
+    tips = [t if isinstance(t, OracleTip) else OracleTip(text=t) for t in request.tips]
+    return _oracle_batch_response([t.text for t in tips], [t.id for t in tips], request.use_llm,
+                                  request.resolve_names)
+
+
+@router.post("/oracle/batch-file")
+async def ask_oracle_batch_file(file: UploadFile = File(...), use_llm: bool = True,
+                                resolve_names: bool = False):
+    """
+    Batch tip analysis from a hotline export: CSV with a text/tip/message column
+    (optional id column), or plain text with one tip per line.
+    """
+    contents = await file.read()
+    if file.filename and file.filename.lower().endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(contents), dtype=str)
+        columns = {c.lower(): c for c in df.columns}
+        text_col = next((columns[c] for c in ("text", "tip", "message", "description") if c in columns), None)
+        if text_col is None:
+            raise HTTPException(status_code=400, detail=f"No tip text column found. Columns: {df.columns.tolist()}")
+        df = df.dropna(subset=[text_col])
+        ids = df[columns["id"]].tolist() if "id" in columns else [None] * len(df)
+        texts = df[text_col].tolist()
+    else:
+        texts = [line.strip() for line in contents.decode("utf-8", errors="replace").splitlines() if line.strip()]
+        ids = [None] * len(texts)
+    return _oracle_batch_response(texts, ids, use_llm, resolve_names)
+
+
+def _oracle_batch_response(texts: List[str], ids: List[Optional[str]], use_llm: bool,
+                           resolve_names: bool = False) -> StreamingResponse:
+    if not texts:
+        raise HTTPException(status_code=400, detail="No tips supplied")
+    if len(texts) > MAX_ORACLE_BATCH:
+        raise HTTPException(status_code=400, detail=f"Batch of {len(texts)} tips exceeds limit of {MAX_ORACLE_BATCH}")
+    print(f"[ORACLE] Batch of {len(texts)} tips (LLM {'on' if use_llm else 'off'})")
+
+    async def ndjson():
+        async for result in WhistleblowerOracle.analyze_batch(texts, use_llm=use_llm, resolve_names=resolve_names):
+            if ids[result["index"]] is not None:
+                result["id"] = ids[result["index"]]
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/oracle/status")
+def oracle_status():
+    """Shared LLM client load, failures and circuit breaker state, plus oracle cache hits."""
+    return {**ollama_client.get_stats(), "cache": oracle_cache.get_stats()}
 
 
 @router.post("/generate-stop-order")
@@ -156,8 +249,79 @@ def generate_stop_order(suspect: StopOrderRequest):
     """Generate Stop Payment Order PDF."""
     print(f"[INFO] Generating Stop Order for: {suspect.full_name}")
     
-    generator = StopOrderGenerator()
-    suspect_dict = {
+    suspect_dict = _suspect_dict(suspect)
+    
+    pdf_bytes, record = stop_order_archive.get_or_render(suspect_dict)
+    
+    return _pdf_response(pdf_bytes, record)
+
+
+@router.post("/generate-stop-orders")
+def generate_stop_orders(request: BulkStopOrderRequest):
+    """
+    Generate Stop Payment Orders in bulk, streamed back as a ZIP while they render.
+    Track progress via GET /stop-orders/jobs/{job_id} (job ID in the X-Job-ID header).
+    """
+    suspects = [_suspect_dict(s) for s in request.suspects]
+    if request.audit_result:
+        suspects.extend(_suspects_from_audit(request.audit_result))
+    if not suspects:
+        raise HTTPException(status_code=400, detail="No suspects supplied")
+    
+    job_id = stop_order_batch.create_job(len(suspects))
+    print(f"[INFO] Bulk Stop Order job {job_id}: {len(suspects)} suspects")
+    
+    return StreamingResponse(
+        stop_order_batch.stream_zip(job_id, suspects),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="StopOrders_{job_id}.zip"',
+            "X-Job-ID": job_id
+        }
+    )
+
+
+@router.get("/stop-orders/jobs/{job_id}")
+def get_stop_order_job(job_id: str):
+    """Progress of a bulk Stop Order job."""
+    job = stop_order_batch.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@router.get("/stop-orders")
+def list_stop_orders(reference: Optional[str] = None, employee_id: Optional[str] = None, limit: int = 100):
+    """Archived Stop Orders by reference number and/or employee."""
+    orders = stop_order_archive.lookup(reference=reference, employee_id=employee_id, limit=limit)
+    return {"count": len(orders), "orders": orders}
+
+
+@router.get("/stop-orders/download")
+def download_stop_order(reference: Optional[str] = None, employee_id: Optional[str] = None):
+    """Re-download the latest archived Stop Order matching a reference and/or employee."""
+    if not reference and not employee_id:
+        raise HTTPException(status_code=400, detail="Provide a reference or employee_id")
+    for record in stop_order_archive.lookup(reference=reference, employee_id=employee_id, limit=10):
+        pdf_bytes = stop_order_archive.read(record)
+        if pdf_bytes is not None:
+            return _pdf_response(pdf_bytes, record)
+    raise HTTPException(status_code=404, detail="No archived Stop Order found")
+
+
+def _pdf_response(pdf_bytes: bytes, record: dict) -> Response:
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="StopOrder_{record["employee_id"]}.pdf"',
+            "X-Reference": record["reference"]
+        }
+    )
+
+
+def _suspect_dict(suspect: StopOrderRequest) -> dict:
+    return {
         "full_name": suspect.full_name,
         "national_id": suspect.national_id,
         "employee_id": suspect.employee_id,
@@ -167,13 +331,27 @@ def generate_stop_order(suspect: StopOrderRequest):
         "fraud_reason": suspect.fraud_reason
     }
     
-    file_path = generator.create_pdf(suspect_dict)
     
-    return FileResponse(
-        path=file_path,
-        filename=f"StopOrder_{suspect.employee_id}.pdf",
-        media_type="application/pdf"
-    )
+def _suspects_from_audit(audit_result: dict) -> List[dict]:
+    """Map /analyze-ml anomalies to Stop Order suspects."""
+    suspects = []
+    for anomaly in audit_result.get("anomalies", []):
+        if not anomaly.get("employee_id"):
+            continue
+        suspects.append({
+            "full_name": anomaly.get("name", "N/A"),
+            "national_id": anomaly.get("national_id", "N/A"),
+            "employee_id": anomaly["employee_id"],
+            "job_group": anomaly.get("job_group", "N/A"),
+            "department": anomaly.get("department", "N/A"),
+            "amount_at_risk": float(anomaly.get("gross_salary", 0) or 0),
+            "fraud_reason": (
+                f"Salary Padding - {anomaly.get('risk_score', 0):.0f}% risk score; "
+                f"Job Group mean KES {anomaly.get('group_mean', 0):,.2f} "
+                f"(sigma {anomaly.get('sigma_val', 0)})"
+            )
+        })
+    return suspects
 
 
 # ============ PHASE 4: SENTINEL FOG NODE ============
@@ -183,30 +361,236 @@ async def verify_attendance(
     employee_id: str = Form(...),
     lat: float = Form(...),
     lon: float = Form(...),
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    device_id: Optional[str] = Form(None)
 ):
     """
     Verify employee attendance using biometric liveness + geofencing.
-    Target Station: KICC, Nairobi (-1.2884, 36.8233)
+    Target Station: the employee's Duty_Station (KICC, Nairobi if unregistered)
     """
     print(f"[SENTINEL] Verification request: {employee_id} at ({lat}, {lon})")
     
-    # Hardcoded KICC Coordinates for Demo
-    station_lat, station_lon = -1.2884, 36.8233
+    station = station_registry.get_station_for_employee(employee_id)
     
     image_bytes = await image.read()
-    result = sentinel_node.verify_transaction(
-        image_bytes, lat, lon, station_lat, station_lon
+    result = await _run_sentinel(
+        sentinel_node.verify_transaction,
+        image_bytes, lat, lon, station["lat"], station["lon"]
     )
+    flags = _record_checkin(employee_id, lat, lon, result, station, device_id)
     
     return {
         "employee_id": employee_id,
         "sentinel_analysis": result,
-        "registered_station": "KICC, Nairobi",
-        "station_coordinates": {"lat": station_lat, "lon": station_lon}
+        "registered_station": station["station_id"],
+        "station_coordinates": {"lat": station["lat"], "lon": station["lon"]},
+        "attendance_flags": flags
     }
 
 
+@router.post("/sentinel/verify-batch")
+async def verify_attendance_batch(
+    employee_ids: List[str] = Form(...),
+    lats: List[float] = Form(...),
+    lons: List[float] = Form(...),
+    images: List[UploadFile] = File(...),
+    device_ids: Optional[List[str]] = Form(None)
+):
+    """
+    Verify a burst of check-ins (e.g. morning clock-in) in one request.
+    Fields are parallel lists: the i-th employee_id, lat, lon and image belong together.
+    """
+    if not (len(employee_ids) == len(lats) == len(lons) == len(images)):
+        raise HTTPException(
+            status_code=400,
+            detail="employee_ids, lats, lons and images must have the same length"
+        )
+    if device_ids is not None and len(device_ids) != len(employee_ids):
+        raise HTTPException(status_code=400, detail="device_ids must match employee_ids in length")
+    print(f"[SENTINEL] Batch verification request: {len(employee_ids)} check-ins")
+    
+    stations = [station_registry.get_station_for_employee(e) for e in employee_ids]
+    
+    checkins = []
+    for lat, lon, image, station in zip(lats, lons, images, stations):
+        checkins.append({
+            "image_bytes": await image.read(),
+            "user_lat": lat,
+            "user_lon": lon,
+            "station_lat": station["lat"],
+            "station_lon": station["lon"]
+        })
+    
+    results = await _run_sentinel(sentinel_node.verify_batch, checkins)
+    
+    response = []
+    for i, (employee_id, result, station) in enumerate(zip(employee_ids, results, stations)):
+        flags = _record_checkin(
+            employee_id, lats[i], lons[i], result, station,
+            device_ids[i] if device_ids else None
+        )
+        response.append({
+            "employee_id": employee_id,
+            "sentinel_analysis": result,
+            "registered_station": station["station_id"],
+            "station_coordinates": {"lat": station["lat"], "lon": station["lon"]},
+            "attendance_flags": flags
+        })
+    
+    return {
+        "count": len(response),
+        "verified": sum(1 for r in results if r["status"] == "VERIFIED"),
+        "flagged": sum(1 for r in response if r["attendance_flags"]),
+        "results": response
+    }
+
+
+@router.post("/sentinel/sync")
+async def sync_offline_checkins(bundle: UploadFile = File(...)):
+    """
+    Bulk sync for reconnecting devices: a ZIP of queued check-ins (manifest.json + images).
+    Check-ins already seen (by client_id) are acknowledged without reprocessing.
+    """
+    data = await bundle.read()
+    try:
+        # Decompression and parsing are CPU-bound: keep them off the event loop
+        checkins, rejected = await _run_sentinel(sync_ledger.parse_bundle, data)
+    except BundleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    new, duplicates = sync_ledger.split_new(checkins)
+    print(f"[SYNC] Bundle {bundle.filename}: {len(checkins)} check-ins, "
+          f"{len(new)} new, {len(duplicates)} duplicate, {len(rejected)} rejected")
+    try:
+        processed = await _process_synced_checkins(new)
+    finally:
+        # Reservations left (failed or cancelled upload) are released so a retry can process them
+        sync_ledger.release([c["client_id"] for c in new])
+    
+    return {
+        "received": len(checkins) + len(rejected),
+        "processed": len(processed),
+        "duplicates": len(duplicates),
+        "rejected": len(rejected),
+        "results": processed + duplicates + rejected
+    }
+
+
+async def _process_synced_checkins(new: List[dict]) -> List[dict]:
+    """Verify and record new synced check-ins; marks each processed in the sync ledger."""
+    # Verify in parallel: one vectorized batch per Sentinel worker
+    stations = [station_registry.get_station_for_employee(c["employee_id"]) for c in new]
+    jobs = [
+        {
+            "image_bytes": c["image_bytes"],
+            "user_lat": c["lat"],
+            "user_lon": c["lon"],
+            "station_lat": st["lat"],
+            "station_lon": st["lon"]
+        }
+        for c, st in zip(new, stations)
+    ]
+    chunk = max(1, -(-len(jobs) // sentinel_pool.max_workers))
+    batches = await asyncio.gather(*[
+        _run_sentinel(sentinel_node.verify_batch, jobs[i:i + chunk])
+        for i in range(0, len(jobs), chunk)
+    ])
+    results = [r for batch in batches for r in batch]
+    
+    processed = []
+    for checkin, result, station in zip(new, results, stations):
+        flags = _record_checkin(
+            checkin["employee_id"], checkin["lat"], checkin["lon"], result, station,
+            checkin["device_id"], timestamp=checkin["captured_at"]
+        )
+        sync_ledger.mark_processed(checkin["client_id"], {
+            "status": result["status"],
+            "flags": [f["type"] for f in flags]
+        })
+        processed.append({
+            "client_id": checkin["client_id"],
+            "employee_id": checkin["employee_id"],
+            "status": "PROCESSED",
+            "sentinel_analysis": result,
+            "registered_station": station["station_id"],
+            "attendance_flags": flags
+        })
+    return processed
+
+
+@router.get("/sentinel/stations/nearby")
+def nearby_stations(lat: float, lon: float, k: int = 5):
+    """Nearest duty stations to a point, plus the stations whose geofence contains it."""
+    return {
+        "nearest": station_registry.nearest(lat, lon, k=k),
+        "containing": station_registry.stations_containing(lat, lon),
+        "registry": station_registry.get_stats()
+    }
+
+
+@router.post("/sentinel/attendance-audit")
+async def audit_attendance_log(file: UploadFile = File(...)):
+    """
+    Bulk geofence audit of an attendance CSV (Employee_ID, Lat, Lon, optional Duty_Station).
+    Returns per-employee compliance for the least compliant employees plus totals;
+    check-ins at Duty_Station IDs not in the station registry are listed under
+    unknown_stations instead of being scored.
+    """
+    if not (file.filename and file.filename.lower().endswith('.csv')):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload CSV.")
+    
+    print(f"[GEOFENCE] Attendance audit upload: {file.filename}")
+    contents = await file.read()
+    try:
+        return await _run_sentinel(geofence_auditor.audit_csv, contents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sentinel/status")
+def sentinel_status():
+    """Sentinel worker pool load and attendance event store counters."""
+    return {
+        "pool": sentinel_pool.get_stats(),
+        "attendance": attendance_store.get_stats(),
+        "replay_guard": replay_index.get_stats(),
+        "sync": sync_ledger.get_stats()
+    }
+
+
+def _record_checkin(employee_id, lat, lon, result, station, device_id=None, timestamp=None):
+    """Replay lookup + attendance event for one verified check-in; returns all flags."""
+    flags = []
+    if result.get("image_hash"):
+        matches = replay_index.check_and_add(int(result["image_hash"], 16), employee_id, timestamp)
+        if matches:
+            flags.append({
+                "type": "IMAGE_REPLAY",
+                "image_hash": result["image_hash"],
+                "matches": matches[:5],
+                "detail": f"Selfie matches {len(matches)} earlier check-in(s), closest by {matches[0]['employee_id']}"
+            })
+            print(f"[SENTINEL] IMAGE_REPLAY: {flags[-1]['detail']}")
+    flags.extend(attendance_store.record(
+        employee_id, lat, lon, result["status"],
+        device_id=device_id, station_id=station["station_id"], timestamp=timestamp
+    ))
+    return flags
+
+
+async def _run_sentinel(fn, *args):
+    """Run a Sentinel job on the worker pool; 503 when the pool is saturated."""
+    try:
+        return await sentinel_pool.run(fn, *args)
+    except SentinelSaturatedError as e:
+        print(f"[SENTINEL] Rejected: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Sentinel is at capacity, please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+
+
 # ============ EXECUTIVE CHATBOT ============
 
 class ChatRequest(BaseModel):
@@ -221,9 +605,10 @@ def executive_chat(request: ChatRequest):
     message = request.message.lower()
     print(f"[CHAT] Query: {message[:50]}...")
     
-    # Get current stats for context-aware responses
-    stats = graph_db.get_stats()
-    ghosts = graph_db.get_ghost_families()
+    # Get current stats for context-aware responses (cached per graph version)
+    summary = graph_db.get_summary()
+    stats = summary["stats"]
+    ghosts = summary["ghost_families"]
     
     # Context-aware response generation
     if "ghost" in message or "worker" in message:
@@ -236,7 +621,8 @@ def executive_chat(request: ChatRequest):
                 f"• Employees analyzed: {stats.get('employees', 0):,}\n" \
                 f"• Ghost families detected: {len(ghosts)}\n" \
                 f"• Bank accounts flagged: {stats.get('banks', 0)}\n" \
-                f"• Devices tracked: {stats.get('devices', 0)}"
+                f"• Devices tracked: {stats.get('devices', 0)}\n" \
+                f"• Shared devices detected: {len(summary['device_spoofing'])}"
     
     elif "salary" in message or "padding" in message or "anomal" in message:
         reply = "The ML engine uses Isolation Forest to detect salary padding. " \
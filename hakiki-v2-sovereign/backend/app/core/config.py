@@ -10,11 +10,45 @@ class Settings:
     NEO4J_URI: str = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
     NEO4J_USER: str = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD: str = os.getenv("NEO4J_PASSWORD", "hakiki_secret_password")
-    
+
+    # Sentinel worker pool (liveness checks run off the event loop)
+    SENTINEL_WORKERS: int = int(os.getenv("SENTINEL_WORKERS", str(os.cpu_count() or 2)))
+    SENTINEL_MAX_QUEUE: int = int(os.getenv("SENTINEL_MAX_QUEUE", "64"))
+
+    # Bulk Stop Order rendering (process pool)
+    STOP_ORDER_WORKERS: int = int(os.getenv("STOP_ORDER_WORKERS", str(os.cpu_count() or 2)))
+
+    # Local LLM (Ollama) shared client
+    OLLAMA_URL: str = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    ORACLE_MODEL: str = os.getenv("ORACLE_MODEL", "llama3")
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Match OLLAMA_NUM_PARALLEL
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "2.0"))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "1.0"))
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "32"))  # Waiting callers beyond this get 429
+    LLM_FAILURE_THRESHOLD: int = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+    LLM_RESET_SECONDS: float = float(os.getenv("LLM_RESET_SECONDS", "30"))
+
+    # Oracle analysis cache (repeated tips skip the LLM)
+    ORACLE_CACHE_SIZE: int = int(os.getenv("ORACLE_CACHE_SIZE", "10000"))
+    ORACLE_CACHE_TTL: float = float(os.getenv("ORACLE_CACHE_TTL", "86400"))  # 0 = no expiry
+
+    # Chat response cache (repeated executive questions skip the LLM)
+    CHAT_CACHE_SIZE: int = int(os.getenv("CHAT_CACHE_SIZE", "1000"))
+    CHAT_CACHE_TTL: float = float(os.getenv("CHAT_CACHE_TTL", "3600"))  # 0 = no expiry
+    # Paraphrase matching is opt-in: 0 = exact matches only; e.g. 0.92 also serves near-identical
+    # questions, but embeddings can score questions that differ in one name or ministry above it
+    CHAT_CACHE_SIMILARITY: float = float(os.getenv("CHAT_CACHE_SIMILARITY", "0"))
+
+    # Optional duty station table (Station_ID, Lat, Lon, Radius_km)
+    STATIONS_PATH: str = os.getenv("HAKIKI_STATIONS_PATH", "")
+
     # Get the project root directory
     _backend_dir = Path(__file__).parent.parent.parent
     _project_dir = _backend_dir.parent
     
+    # Runtime data (Stop Order archive, attendance event log); created on first write
+    DATA_DIR: str = os.getenv("HAKIKI_DATA_DIR", str(_backend_dir / "data"))
+    
     # Dataset path - try multiple locations
     DATASET_PATH: str = str(_project_dir / "data" / "raw" / "hakiki_v2_synthetic_payroll.csv")
     
@@ -2,6 +2,8 @@
 In-Memory Graph Engine for HAKIKI AI v2.0
 Replaces Neo4j with NetworkX for zero-dependency local operation.
 """
+import threading
+
 import networkx as nx
 import pandas as pd
 from typing import Dict, List, Any
@@ -11,6 +13,9 @@ class InMemoryGraph:
     """
     Singleton In-Memory Graph Database.
     Uses NetworkX DiGraph for fraud pattern detection.
+
+    Audit summaries (stats, ghost families, shared devices) are computed in one
+    pass per graph version and cached; load_data() bumps the version.
     """
     _instance = None
 
@@ -19,6 +24,9 @@ class InMemoryGraph:
             cls._instance = super(InMemoryGraph, cls).__new__(cls)
             cls._instance.graph = nx.DiGraph()
             cls._instance.df = None
+            cls._instance.version = 0
+            cls._instance._summary = None
+            cls._instance._summary_lock = threading.Lock()
         return cls._instance
 
     def load_data(self, df: pd.DataFrame) -> Dict[str, Any]:
@@ -30,6 +38,7 @@ class InMemoryGraph:
         G = self.graph
         G.clear()
         self.df = df
+        self._invalidate()
         print(f"[INFO] Ingesting {len(df)} records into Memory...")
         
         for _, row in df.iterrows():
@@ -52,6 +61,7 @@ class InMemoryGraph:
             G.add_edge(emp_id, f"bank_{bank_acc}", relationship="DEPOSITS_TO")
             G.add_edge(emp_id, f"dev_{device_id[:8]}", relationship="USES_DEVICE")
             
+        self._invalidate()
         print(f"[SUCCESS] Graph Built: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges.")
         
         return {
@@ -60,44 +70,76 @@ class InMemoryGraph:
             "employees": len(df)
         }
 
-    def get_ghost_families(self) -> List[Dict[str, Any]]:
-        """Finds Bank Accounts with multiple depositors (Star Topology)"""
+    # ---------------- Cached audit summary ----------------
+
+    def _invalidate(self):
+        with self._summary_lock:
+            self.version += 1
+            self._summary = None
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        {version, stats, ghost_families, device_spoofing} for the current graph,
+        computed once per version. Treat the result as read-only.
+        """
+        summary = self._summary
+        if summary is not None:
+            return summary
+        with self._summary_lock:
+            if self._summary is None:
+                self._summary = self._compute_summary()
+            return self._summary
+
+    def _compute_summary(self) -> Dict[str, Any]:
+        """One pass over the nodes: group counts, plus banks and devices with several employees."""
         G = self.graph
-        suspects = []
-        
-        bank_nodes = [n for n, attr in G.nodes(data=True) if attr.get('group') == 2]
-        
-        for bank in bank_nodes:
-            depositors = [n for n in G.predecessors(bank) if G.nodes[n].get('group') == 1]
-            if len(set(depositors)) > 1:
-                depositor_names = [G.nodes[d].get('name', d) for d in depositors]
-                suspects.append({
-                    "bank_account": bank,
-                    "bank_name": G.nodes[bank].get('name'),
-                    "shared_count": len(set(depositors)),
-                    "fraudsters": depositor_names[:5]
+        counts = {1: 0, 2: 0, 3: 0}
+        ghost_families, device_spoofing = [], []
+        for node, attr in G.nodes(data=True):
+            group = attr.get('group')
+            if group in counts:
+                counts[group] += 1
+            if group not in (2, 3):
+                continue
+            members = [n for n in G.predecessors(node) if G.nodes[n].get('group') == 1]
+            if len(set(members)) <= 1:
+                continue
+            names = [G.nodes[m].get('name', m) for m in members]
+            if group == 2:
+                ghost_families.append({
+                    "bank_account": node,
+                    "bank_name": attr.get('name'),
+                    "shared_count": len(set(members)),
+                    "fraudsters": names[:5]
+                })
+            else:
+                device_spoofing.append({
+                    "device_id": node,
+                    "shared_count": len(set(members)),
+                    "users": names[:5]
                 })
-        
-        return sorted(suspects, key=lambda x: x['shared_count'], reverse=True)
+
+        print(f"[GRAPH] Summary computed for graph version {self.version}")
+        return {
+            "version": self.version,
+            "stats": {
+                "total_nodes": G.number_of_nodes(),
+                "total_edges": G.number_of_edges(),
+                "employees": counts[1],
+                "banks": counts[2],
+                "devices": counts[3]
+            },
+            "ghost_families": sorted(ghost_families, key=lambda x: x['shared_count'], reverse=True),
+            "device_spoofing": sorted(device_spoofing, key=lambda x: x['shared_count'], reverse=True)
+        }
+
+    def get_ghost_families(self) -> List[Dict[str, Any]]:
+        """Finds Bank Accounts with multiple depositors (Star Topology)"""
+        return self.get_summary()["ghost_families"]
 
     def get_device_spoofing(self) -> List[Dict[str, Any]]:
         """Finds Devices shared by multiple employees"""
-        G = self.graph
-        suspects = []
-        
-        device_nodes = [n for n, attr in G.nodes(data=True) if attr.get('group') == 3]
-        
-        for device in device_nodes:
-            users = [n for n in G.predecessors(device) if G.nodes[n].get('group') == 1]
-            if len(set(users)) > 1:
-                user_names = [G.nodes[u].get('name', u) for u in users]
-                suspects.append({
-                    "device_id": device,
-                    "shared_count": len(set(users)),
-                    "users": user_names[:5]
-                })
-        
-        return sorted(suspects, key=lambda x: x['shared_count'], reverse=True)
+        return self.get_summary()["device_spoofing"]
 
     def get_visualization_data(self, limit: int = 500) -> Dict[str, Any]:
         """Returns JSON compatible with react-force-graph-3d"""
@@ -130,14 +172,7 @@ class InMemoryGraph:
 
     def get_stats(self) -> Dict[str, int]:
         """Get graph statistics"""
-        G = self.graph
-        return {
-            "total_nodes": G.number_of_nodes(),
-            "total_edges": G.number_of_edges(),
-            "employees": len([n for n, a in G.nodes(data=True) if a.get('group') == 1]),
-            "banks": len([n for n, a in G.nodes(data=True) if a.get('group') == 2]),
-            "devices": len([n for n, a in G.nodes(data=True) if a.get('group') == 3])
-        }
+        return self.get_summary()["stats"]
 
 
 # Singleton instance
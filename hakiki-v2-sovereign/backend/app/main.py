@@ -5,6 +5,8 @@ Sovereign In-Memory Architecture (No External Dependencies)
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import audit
+from app.services.llm_client import ollama_client
+from app.services.oracle import load_name_index
 
 app = FastAPI(
     title="HAKIKI AI v2.0",
@@ -25,6 +27,17 @@ app.add_middleware(
 app.include_router(audit.router, prefix="/api/v1/audit", tags=["audit"])
 
 
+@app.on_event("startup")
+async def warm_name_index():
+    # Index payroll names up front so the first /oracle call doesn't pay for it
+    await load_name_index()
+
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await ollama_client.aclose()
+
+
 @app.get("/")
 async def root():
     return {
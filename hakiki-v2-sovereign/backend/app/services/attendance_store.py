@@ -0,0 +1,234 @@
+"""
+Attendance Event Store for HAKIKI AI v2.0
+Append-only log of Sentinel check-ins, partitioned by day (one JSONL file per day),
+with in-memory indexes for real-time buddy-punching detection.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+
+
+class AttendanceEventStore:
+    """
+    Records every Sentinel verification and flags, as events arrive:
+    1. SHARED_DEVICE: one device used by several employees within the window
+    2. IMPOSSIBLE_TRAVEL: one employee at two distant places faster than possible
+
+    Every index is capped, so each event costs bounded time and memory.
+    """
+
+    # Detection windows / thresholds
+    DEVICE_WINDOW_HOURS = 12
+    MAX_TRAVEL_KMH = 120.0  # Faster than this between check-ins is impossible by road
+    MIN_TRAVEL_KM = 2.0  # Ignore GPS jitter around a station
+
+    # Memory caps (LRU eviction)
+    MAX_DEVICES = 200_000
+    MAX_EMPLOYEES_PER_DEVICE = 32
+    MAX_EMPLOYEES = 500_000
+
+    # Earth radius in km
+    R = 6371.0
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = base_dir or Path(settings.DATA_DIR) / "attendance"  # Created on first write
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_day = None
+        # device_id -> OrderedDict(employee_id -> last_seen_ts); devices in LRU order
+        self._device_users: "OrderedDict[str, OrderedDict]" = OrderedDict()
+        # employee_id -> last check-in {ts, lat, lon, station_id}
+        self._last_checkin: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events = 0
+        self._flags = 0
+        self._replay_recent()
+
+    # ---------------- Write path ----------------
+
+    def record(self, employee_id: str, lat: float, lon: float, status: str,
+               device_id: Optional[str] = None, station_id: Optional[str] = None,
+               timestamp: Optional[float] = None, **extra) -> List[Dict[str, Any]]:
+        """
+        Append a check-in and return any fraud flags it raises.
+
+        Args:
+            employee_id: Employee checking in
+            lat, lon: Reported check-in location
+            status: Sentinel verdict (VERIFIED, SPOOF_DETECTED, ...)
+            device_id: Device the check-in came from, if known
+            station_id: Duty station the check-in was evaluated against
+            timestamp: Unix time of capture (defaults to now; offline
+                devices send their original capture time)
+        """
+        ts = float(timestamp) if timestamp is not None else time.time()
+        event = {
+            "ts": ts,
+            "employee_id": str(employee_id),
+            "device_id": device_id,
+            "lat": float(lat),
+            "lon": float(lon),
+            "station_id": station_id,
+            "status": status,
+            **extra
+        }
+
+        with self._lock:
+            self._append(event)
+            flags = self._index(event)
+            self._events += 1
+            self._flags += len(flags)
+
+        for flag in flags:
+            print(f"[ATTENDANCE] {flag['type']}: {flag['detail']}")
+        return flags
+
+    def _append(self, event: Dict[str, Any]):
+        """Append one JSON line to the day's partition (file handle kept open)."""
+        day = datetime.fromtimestamp(event["ts"]).strftime("%Y%m%d")
+        if day != self._file_day:
+            if self._file is not None:
+                self._file.close()
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(self._partition_path(day), "a", encoding="utf-8")
+            self._file_day = day
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+
+    def _partition_path(self, day: str) -> Path:
+        return self.base_dir / f"attendance_{day}.jsonl"
+
+    # ---------------- Real-time indexes ----------------
+
+    def _index(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Update indexes with one event and return the flags it raises."""
+        flags = []
+        employee_id = event["employee_id"]
+        ts = event["ts"]
+
+        # 1. Device -> employees (buddy punching)
+        device_id = event.get("device_id")
+        if device_id:
+            users = self._device_users.get(device_id)
+            if users is None:
+                users = OrderedDict()
+                self._device_users[device_id] = users
+                if len(self._device_users) > self.MAX_DEVICES:
+                    self._device_users.popitem(last=False)
+            else:
+                self._device_users.move_to_end(device_id)
+
+            # Synced events carry their capture time, so an event can be older than
+            # entries already indexed: match within the window on both sides
+            window = self.DEVICE_WINDOW_HOURS * 3600
+            others = [e for e, seen in users.items() if e != employee_id and abs(seen - ts) <= window]
+
+            users[employee_id] = max(ts, users.get(employee_id, ts))
+            # Age out relative to the device's newest use and evict the oldest
+            # timestamps first (arrival order is not time order)
+            cutoff = max(users.values()) - window
+            for stale in [e for e, seen in users.items() if seen < cutoff]:
+                del users[stale]
+            while len(users) > self.MAX_EMPLOYEES_PER_DEVICE:
+                del users[min(users, key=users.get)]
+
+            if others:
+                flags.append({
+                    "type": "SHARED_DEVICE",
+                    "device_id": device_id,
+                    "employees": [employee_id] + others,
+                    "detail": f"Device {device_id} used by {len(others) + 1} employees within {self.DEVICE_WINDOW_HOURS}h"
+                })
+
+        # 2. Employee -> last check-in (impossible travel)
+        last = self._last_checkin.get(employee_id)
+        if last is not None:
+            distance_km = self._haversine_distance(last["lat"], last["lon"], event["lat"], event["lon"])
+            hours = abs(ts - last["ts"]) / 3600
+            if distance_km >= self.MIN_TRAVEL_KM:
+                speed_kmh = distance_km / hours if hours > 0 else math.inf
+                if speed_kmh > self.MAX_TRAVEL_KMH:
+                    flags.append({
+                        "type": "IMPOSSIBLE_TRAVEL",
+                        "employee_id": employee_id,
+                        "from_station": last.get("station_id"),
+                        "to_station": event.get("station_id"),
+                        "distance_km": round(distance_km, 3),
+                        "minutes_apart": round(hours * 60, 1),
+                        "detail": f"{employee_id} moved {distance_km:.1f}km in {hours * 60:.0f} min"
+                    })
+
+        if last is None or ts >= last["ts"]:
+            self._last_checkin[employee_id] = {
+                "ts": ts, "lat": event["lat"], "lon": event["lon"], "station_id": event.get("station_id")
+            }
+            self._last_checkin.move_to_end(employee_id)
+            if len(self._last_checkin) > self.MAX_EMPLOYEES:
+                self._last_checkin.popitem(last=False)
+
+        return flags
+
+    def _replay_recent(self):
+        """Warm the indexes from the partitions inside the detection window."""
+        now = datetime.now()
+        days = {(now - timedelta(hours=h)).strftime("%Y%m%d") for h in (0, self.DEVICE_WINDOW_HOURS)}
+        replayed = 0
+        for day in sorted(days):
+            path = self._partition_path(day)
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                        replayed += 1
+                    except (ValueError, KeyError):
+                        continue
+        if replayed:
+            print(f"[ATTENDANCE] Replayed {replayed} recent events into memory")
+
+    # ---------------- Read path ----------------
+
+    def get_device_employees(self, device_id: str) -> List[str]:
+        """Employees seen on a device within the window."""
+        with self._lock:
+            return list(self._device_users.get(device_id, {}).keys())
+
+    def read_day(self, day: str) -> List[Dict[str, Any]]:
+        """All events for one day partition (YYYYMMDD)."""
+        path = self._partition_path(day)
+        if not path.exists():
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "events_recorded": self._events,
+                "flags_raised": self._flags,
+                "devices_tracked": len(self._device_users),
+                "employees_tracked": len(self._last_checkin)
+            }
+
+    def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Great-circle distance in km (Haversine)."""
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+
+        a = (math.sin(dlat / 2) ** 2 +
+             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+             math.sin(dlon / 2) ** 2)
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+        return self.R * c
+
+
+# Singleton instance
+attendance_store = AttendanceEventStore()
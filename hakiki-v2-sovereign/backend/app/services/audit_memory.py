@@ -0,0 +1,90 @@
+"""
+Audit Memory for HAKIKI AI v2.0
+Latest payroll scan findings, kept in process for the chat assistant.
+Every update bumps a version counter; the JSON file is only a durable copy,
+written by a background thread (bursts of scans coalesce into one write).
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class AuditMemory:
+    """
+    In-process store of the latest audit findings.
+
+    update() is cheap and never touches the disk on the caller's thread;
+    snapshot() returns (version, findings) so readers can cache anything
+    derived from the findings until the version changes.
+    """
+
+    def __init__(self, path: str = "audit_memory.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._findings: Optional[Dict[str, Any]] = None
+        self._version = 0
+        self._written_version = 0
+        self._writer: Optional[threading.Thread] = None
+        self._load()
+
+    def _load(self):
+        """Pick up findings persisted by a previous run."""
+        try:
+            with open(self.path, "r") as f:
+                self._findings = json.load(f)
+            self._version = self._written_version = 1
+            print(f"[MEMORY] Loaded audit findings from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[MEMORY] Could not read {self.path}: {e}")
+
+    def update(self, findings: Dict[str, Any]) -> int:
+        """Replace the findings and schedule a disk write. Returns the new version."""
+        with self._lock:
+            self._findings = dict(findings)
+            self._version += 1
+            version = self._version
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="audit-memory-writer", daemon=True)
+                self._writer.start()
+        return version
+
+    def snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """(version, findings); version 0 and None before the first scan."""
+        with self._lock:
+            return self._version, self._findings
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _write_loop(self):
+        """Write until the file holds the latest version."""
+        while True:
+            with self._lock:
+                if self._written_version == self._version:
+                    self._writer = None
+                    return
+                version, findings = self._version, self._findings
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(findings, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[MEMORY] Failed to persist audit findings: {e}")
+            with self._lock:
+                # Written or not, don't retry this version; the next update will
+                self._written_version = version
+
+    def flush(self, timeout: float = 5.0):
+        """Wait for a pending write (call on shutdown)."""
+        writer = self._writer
+        if writer is not None:
+            writer.join(timeout)
+
+
+# Singleton instance
+audit_memory = AuditMemory()
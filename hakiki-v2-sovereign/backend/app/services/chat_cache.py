@@ -0,0 +1,122 @@
+"""
+Chat Response Cache for HAKIKI AI v2.0
+Answers repeated executive questions without another LLM generation.
+Keyed by (model, audit findings version, normalized query); optionally an
+embedding lookup also matches paraphrases of a cached question.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.lru_cache import LRUCache
+
+
+def normalize_query(text: str) -> str:
+    """
+    Casefolded, whitespace collapsed ("What is  the Total risk?" -> "what is the total risk?").
+    Symbols are kept: "salary > 100,000" and "salary < 100,000" are different questions.
+    """
+    return " ".join(str(text).casefold().split())
+
+
+class ChatResponseCache:
+    """
+    Two layers over one bounded LRU of replies:
+    1. Exact: normalized query (and user context) within a (model, version) scope
+    2. Semantic (if an embedding function is set): the most similar cached
+       question in the same scope, accepted above `similarity`
+
+    A new findings version changes the scope, so stale answers are never
+    served; they age out through LRU eviction.
+    """
+
+    EMBEDDING_MEMO = 256  # Query embeddings kept between get_similar() and put()
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None, similarity: float = 0.0,
+                 embed: Optional[Callable[[List[str]], Sequence[Sequence[float]]]] = None):
+        self.similarity = similarity
+        self.embed = embed
+        self._replies = LRUCache(max_entries, ttl_seconds)
+        # key -> unit embedding of its query, insertion order (bounded like the replies)
+        self._vectors: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._embeddings = LRUCache(self.EMBEDDING_MEMO)
+        self._lock = threading.Lock()
+        self._semantic_hits = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.embed is not None and self.similarity > 0
+
+    @staticmethod
+    def _scope(model: str, version: int, context: str) -> tuple:
+        return model, version, normalize_query(context)
+
+    def _embedding(self, query: str) -> np.ndarray:
+        vector = self._embeddings.get(query)
+        if vector is None:
+            vector = np.asarray(self.embed([query])[0], dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            self._embeddings.put(query, vector)
+        return vector
+
+    def get(self, query: str, model: str, version: int, context: str = "") -> Optional[str]:
+        """Reply cached for exactly this question (after normalization), or None."""
+        return self._replies.get((self._scope(model, version, context), normalize_query(query)))
+
+    def get_similar(self, query: str, model: str, version: int, context: str = "") -> Optional[str]:
+        """
+        Reply cached for the closest paraphrase in scope, or None.
+        Embeds the query (CPU-bound: call it off the event loop).
+        """
+        if not self.semantic_enabled:
+            return None
+        scope = self._scope(model, version, context)
+        vector = self._embedding(normalize_query(query))
+        with self._lock:
+            keys = [key for key in self._vectors if key[0] == scope]
+            if not keys:
+                return None
+            scores = np.stack([self._vectors[key] for key in keys]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        reply = self._replies.get(keys[best])
+        if reply is None:
+            with self._lock:
+                self._vectors.pop(keys[best], None)  # Reply evicted or expired
+            return None
+        with self._lock:
+            self._semantic_hits += 1
+        return reply
+
+    def put(self, query: str, reply: str, model: str, version: int, context: str = ""):
+        normalized = normalize_query(query)
+        key = (self._scope(model, version, context), normalized)
+        self._replies.put(key, reply)
+        if not self.semantic_enabled:
+            return
+        try:
+            vector = self._embedding(normalized)
+        except Exception as e:
+            print(f"[CHAT-CACHE] Embedding failed, exact match only: {e}")
+            return
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self._replies.max_entries:
+                self._vectors.popitem(last=False)
+
+    def clear(self):
+        self._replies.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._replies.get_stats(),
+            "semantic": self.semantic_enabled,
+            "similarity": self.similarity,
+            "semantic_hits": self._semantic_hits
+        }
@@ -0,0 +1,176 @@
+"""
+Edge Sync Bundles for HAKIKI AI v2.0
+Parses compressed offline check-in backlogs from the Sentinel mobile app / fog nodes
+and deduplicates them by client-side ID so retried uploads are processed once
+(including retries that arrive while the first upload is still being processed).
+
+Bundle format (ZIP):
+    manifest.json  {"device_id": "...", "checkins": [
+                       {"client_id": "...", "employee_id": "...", "lat": -1.28, "lon": 36.82,
+                        "captured_at": "2026-01-12T07:58:03" | 1768197483, "image": "0001.jpg",
+                        "device_id": "..." (optional, overrides bundle device_id)}, ...]}
+    0001.jpg, 0002.jpg, ...
+"""
+import io
+import json
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+
+class BundleError(ValueError):
+    """Raised when a sync bundle is malformed or too large."""
+
+
+# Raised by ZipFile.read for a corrupt or truncated member
+CORRUPT_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+
+
+class EdgeSyncLedger:
+    """
+    Bounded record of client check-in IDs already processed, with their outcome.
+    Oldest IDs are forgotten first once MAX_CLIENT_IDS is reached. IDs being
+    processed are reserved (in flight) until mark_processed() or release().
+    """
+
+    MAX_CLIENT_IDS = 500_000
+
+    # Bundle guards
+    MAX_CHECKINS = 5_000
+    MAX_UNCOMPRESSED_BYTES = 512 * 1024 * 1024
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, max_client_ids: int = MAX_CLIENT_IDS):
+        self.max_client_ids = max_client_ids
+        self._seen: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    # ---------------- Parsing ----------------
+
+    def parse_bundle(self, data: bytes) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Unpack a ZIP bundle into check-ins with image bytes attached.
+
+        Returns:
+            (checkins, rejected) - rejected items carry client_id and error
+
+        Raises:
+            BundleError: if the archive or manifest is unusable
+        """
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile as e:
+            raise BundleError(f"Not a valid ZIP bundle: {e}")
+
+        with archive:
+            total_size = sum(info.file_size for info in archive.infolist())
+            if total_size > self.MAX_UNCOMPRESSED_BYTES:
+                raise BundleError(f"Bundle expands to {total_size:,} bytes (limit {self.MAX_UNCOMPRESSED_BYTES:,})")
+
+            try:
+                manifest = json.loads(archive.read(self.MANIFEST_NAME))
+            except KeyError:
+                raise BundleError(f"Bundle has no {self.MANIFEST_NAME}")
+            except (ValueError, *CORRUPT_MEMBER_ERRORS) as e:
+                raise BundleError(f"Invalid {self.MANIFEST_NAME}: {e}")
+            if not isinstance(manifest, dict):
+                raise BundleError(f"{self.MANIFEST_NAME} must be a JSON object")
+
+            entries = manifest.get("checkins", [])
+            if not isinstance(entries, list):
+                raise BundleError(f"{self.MANIFEST_NAME} 'checkins' must be a list")
+            if len(entries) > self.MAX_CHECKINS:
+                raise BundleError(f"Bundle has {len(entries)} check-ins (limit {self.MAX_CHECKINS})")
+
+            names = set(archive.namelist())
+            checkins, rejected = [], []
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    rejected.append({"client_id": None, "status": "REJECTED", "error": "check-in is not an object"})
+                    continue
+                client_id = str(entry.get("client_id", ""))
+                try:
+                    if not client_id:
+                        raise ValueError("missing client_id")
+                    if entry.get("image") not in names:
+                        raise ValueError(f"image '{entry.get('image')}' not in bundle")
+                    checkins.append({
+                        "client_id": client_id,
+                        "employee_id": str(entry["employee_id"]),
+                        "lat": float(entry["lat"]),
+                        "lon": float(entry["lon"]),
+                        "device_id": entry.get("device_id") or manifest.get("device_id"),
+                        "captured_at": self._parse_timestamp(entry.get("captured_at")),
+                        "image_bytes": archive.read(entry["image"])
+                    })
+                except (KeyError, TypeError, ValueError, *CORRUPT_MEMBER_ERRORS) as e:
+                    rejected.append({"client_id": client_id or None, "status": "REJECTED", "error": str(e)})
+
+        return checkins, rejected
+
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[float]:
+        """Unix seconds or ISO-8601 -> Unix seconds (None = use server time)."""
+        if value is None or value == "":
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        return datetime.fromisoformat(str(value)).timestamp()
+
+    # ---------------- Deduplication ----------------
+
+    def split_new(self, checkins: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Separate unseen check-ins from ones already processed, in flight in another
+        upload, or repeated in this bundle. The new ones are reserved as in flight:
+        call mark_processed() or release() for each.
+
+        Returns:
+            (new_checkins, duplicate_results)
+        """
+        new, duplicates = [], []
+        in_bundle = set()
+        with self._lock:
+            for checkin in checkins:
+                client_id = checkin["client_id"]
+                previous = self._seen.get(client_id)
+                if previous is None and client_id in self._in_flight:
+                    previous = {"status": "IN_PROGRESS"}
+                if previous is not None or client_id in in_bundle:
+                    duplicates.append({
+                        "client_id": client_id,
+                        "employee_id": checkin["employee_id"],
+                        "status": "DUPLICATE",
+                        "previous_result": previous
+                    })
+                    continue
+                in_bundle.add(client_id)
+                new.append(checkin)
+            self._in_flight.update(in_bundle)
+        return new, duplicates
+
+    def mark_processed(self, client_id: str, outcome: Dict[str, Any]):
+        """Remember a processed client ID and a compact outcome for later duplicates."""
+        with self._lock:
+            self._in_flight.discard(client_id)
+            self._seen[client_id] = outcome
+            self._seen.move_to_end(client_id)
+            while len(self._seen) > self.max_client_ids:
+                self._seen.popitem(last=False)
+
+    def release(self, client_ids: List[str]):
+        """Drop in-flight reservations that were never processed (failed upload), so a retry can run."""
+        with self._lock:
+            self._in_flight.difference_update(client_ids)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"client_ids_tracked": len(self._seen), "client_ids_in_flight": len(self._in_flight)}
+
+
+# Singleton instance
+sync_ledger = EdgeSyncLedger()
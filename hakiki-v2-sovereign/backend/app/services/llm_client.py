@@ -0,0 +1,399 @@
+"""
+Local LLM Gateway for HAKIKI AI v2.0
+One shared, connection-pooled async client for the Ollama server, used by every
+caller (chat, oracle). Generations are admitted through a priority queue
+(interactive chat ahead of batch tip analysis) with a max in-flight limit sized
+to the model server, and a circuit breaker lets callers skip straight to their
+fallback while the LLM is down.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Any, Optional
+
+import httpx
+
+from app.core.config import settings
+
+
+# Admission priorities (lower is served first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM cannot serve a request (circuit open, busy, error or timeout)."""
+
+
+class LLMQueueFullError(LLMUnavailableError):
+    """Raised immediately when the gateway queue is full (HTTP callers answer 429)."""
+
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN after `failure_threshold` consecutive failures.
+    OPEN rejects immediately for `reset_seconds`, then HALF_OPEN lets one
+    probe through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "CLOSED"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "HALF_OPEN"
+        return "OPEN"
+
+    def allow(self) -> bool:
+        """Whether a call may go to the LLM now."""
+        with self._lock:
+            state = self._state()
+            if state == "CLOSED":
+                return True
+            if state == "HALF_OPEN" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """A call ended without a verdict (e.g. cancelled): free the half-open probe, count nothing."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                print(f"[LLM] Circuit OPEN for {self.reset_seconds:.0f}s after {self._failures} failures")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures, "trips": self._trips}
+
+
+class AdmissionQueue:
+    """
+    At most `max_in_flight` holders at once. Callers beyond that wait in a
+    heap ordered by (priority, arrival); a freed slot goes straight to the
+    next waiter. With `max_queue` callers already waiting, new ones are
+    rejected at once instead of piling up behind a saturated model.
+    Bound to one event loop (no locking needed).
+    """
+
+    RECENT_WAITS = 1000  # Per priority, for percentiles
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters = []  # (priority, seq, future)
+        self._seq = itertools.count()
+        self._metrics: Dict[int, Dict[str, Any]] = {}
+
+    def _metric(self, priority: int) -> Dict[str, Any]:
+        metric = self._metrics.get(priority)
+        if metric is None:
+            metric = self._metrics[priority] = {
+                "admitted": 0, "rejected": 0, "timed_out": 0,
+                "wait_total": 0.0, "wait_max": 0.0, "recent": deque(maxlen=self.RECENT_WAITS)
+            }
+        return metric
+
+    async def acquire(self, priority: int, timeout: float):
+        """
+        Wait for a slot.
+
+        Raises:
+            LLMQueueFullError: `max_queue` callers are already waiting
+            asyncio.TimeoutError: no slot within `timeout` seconds
+        """
+        metric = self._metric(priority)
+        started = time.monotonic()
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+        else:
+            if self.queued >= self.max_queue:
+                metric["rejected"] += 1
+                raise LLMQueueFullError(f"LLM queue full ({self.queued} waiting, {self.in_flight} running)")
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), future))
+            self.queued += 1
+            try:
+                await asyncio.wait_for(future, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                if future.done() and not future.cancelled():
+                    self.release()  # Slot was handed over just as we gave up
+                else:
+                    future.cancel()
+                    self.queued -= 1
+                metric["timed_out"] += 1
+                raise
+
+        waited = time.monotonic() - started
+        metric["admitted"] += 1
+        metric["wait_total"] += waited
+        metric["wait_max"] = max(metric["wait_max"], waited)
+        metric["recent"].append(waited)
+
+    def release(self):
+        """Free a slot, handing it to the highest-priority waiter if any."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.queued -= 1
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_priority = {}
+        for priority, metric in sorted(self._metrics.items()):
+            recent = sorted(metric["recent"])
+            by_priority[PRIORITY_NAMES.get(priority, str(priority))] = {
+                "admitted": metric["admitted"],
+                "rejected": metric["rejected"],
+                "timed_out": metric["timed_out"],
+                "wait_avg_ms": round(metric["wait_total"] / max(metric["admitted"], 1) * 1000, 1),
+                "wait_p95_ms": round(recent[int(len(recent) * 0.95)] * 1000, 1) if recent else 0.0,
+                "wait_max_ms": round(metric["wait_max"] * 1000, 1)
+            }
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "by_priority": by_priority
+        }
+
+
+class LLMStream:
+    """An open streaming generation. Holds its gateway slot until aclose()."""
+
+    def __init__(self, response: httpx.Response, admission: AdmissionQueue):
+        self._response = response
+        self._admission = admission
+        self._closed = False
+
+    async def chunks(self) -> AsyncIterator[Dict[str, Any]]:
+        """Ollama's NDJSON chunks ({"response": "...", "done": false}, ...)."""
+        async for line in self._response.aiter_lines():
+            if line:
+                yield json.loads(line)
+
+    async def aclose(self):
+        """Close the upstream response (Ollama stops generating) and free the slot."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._response.aclose()
+        finally:
+            self._admission.release()
+
+
+class OllamaClient:
+    """
+    Shared async gateway for Ollama's /api/generate.
+    Keep-alive connections are reused across requests; at most
+    `max_concurrency` generations run at once, waiting callers are admitted
+    by priority, and each waits at most `queue_timeout` seconds (or its own).
+    """
+
+    def __init__(self, base_url: str, max_concurrency: int, timeout: float, queue_timeout: float,
+                 breaker: Optional[CircuitBreaker] = None, max_queue: int = 32):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._admission: Optional[AdmissionQueue] = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "streams": 0, "succeeded": 0, "failed": 0, "short_circuited": 0,
+                       "busy": 0, "rejected": 0, "cancelled": 0}
+
+    async def _ensure_client(self):
+        """Client and admission queue are bound to the running event loop; rebuild if it changed."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            stale = self._client
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._admission = AdmissionQueue(self.max_concurrency, self.max_queue)
+            self._loop = loop
+            if stale is not None:
+                try:
+                    await stale.aclose()
+                except Exception as e:  # Its pooled connections belong to the previous loop
+                    print(f"[LLM] Previous client closed with error: {e}")
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    async def _admit(self, priority: int, queue_timeout: Optional[float]):
+        """Take a slot for one generation (circuit and queue checks included)."""
+        if self.breaker.state == "OPEN":
+            self._count("short_circuited")
+            raise LLMUnavailableError("LLM circuit open")
+
+        await self._ensure_client()
+        try:
+            await self._admission.acquire(priority, self.queue_timeout if queue_timeout is None else queue_timeout)
+        except LLMQueueFullError:
+            self._count("rejected")
+            raise
+        except asyncio.TimeoutError:
+            # Saturation is not a server fault, so it doesn't count towards the breaker
+            self._count("busy")
+            raise LLMUnavailableError(f"All {self.max_concurrency} LLM slots busy")
+
+        if not self.breaker.allow():
+            self._admission.release()
+            self._count("short_circuited")
+            raise LLMUnavailableError("LLM circuit open")
+
+    def _fail(self, e: Exception) -> LLMUnavailableError:
+        self.breaker.record_failure()
+        self._count("failed")
+        return LLMUnavailableError(f"{type(e).__name__}: {e}")
+
+    def _abandon(self, e: BaseException):
+        """
+        A call ended by something other than the server (client disconnect, batch
+        cancelled, a bug): not an LLM failure, but a half-open probe is freed.
+        """
+        self.breaker.release_probe()
+        if isinstance(e, asyncio.CancelledError):
+            self._count("cancelled")
+
+    async def generate(self, model: str, prompt: str, format: Optional[str] = None,
+                       timeout: Optional[float] = None, priority: int = PRIORITY_INTERACTIVE,
+                       queue_timeout: Optional[float] = None) -> str:
+        """
+        Run one non-streaming generation and return the model's `response` text.
+
+        Raises:
+            LLMQueueFullError: too many callers already waiting
+            LLMUnavailableError: circuit open, no free slot in time, HTTP error or timeout
+        """
+        self._count("requests")
+        await self._admit(priority, queue_timeout)
+
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if format:
+            payload["format"] = format
+        try:
+            response = await self._client.post("/api/generate", json=payload, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            text = response.json().get("response", "")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            raise self._fail(e) from e
+        except BaseException as e:
+            self._abandon(e)
+            raise
+        finally:
+            self._admission.release()
+
+        self.breaker.record_success()
+        self._count("succeeded")
+        return text
+
+    async def open_stream(self, model: str, prompt: str, timeout: Optional[float] = None,
+                          priority: int = PRIORITY_INTERACTIVE,
+                          queue_timeout: Optional[float] = None) -> LLMStream:
+        """
+        Start a streaming generation. The returned stream holds a slot until
+        its aclose(); errors before the first chunk raise here.
+
+        Raises:
+            LLMQueueFullError: too many callers already waiting
+            LLMUnavailableError: circuit open, no free slot in time, HTTP error or timeout
+        """
+        self._count("streams")
+        await self._admit(priority, queue_timeout)
+
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        try:
+            request = self._client.build_request("POST", "/api/generate", json=payload,
+                                                 timeout=timeout or self.timeout)
+            response = await self._client.send(request, stream=True)
+            if response.status_code != 200:
+                try:
+                    body = (await response.aread()).decode(errors="replace")
+                finally:
+                    await response.aclose()
+                raise httpx.HTTPStatusError(body, request=request, response=response)
+        except httpx.HTTPError as e:
+            self._admission.release()
+            raise self._fail(e) from e
+        except BaseException as e:
+            self._admission.release()
+            self._abandon(e)
+            raise
+
+        self.breaker.record_success()
+        self._count("succeeded")
+        return LLMStream(response, self._admission)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_concurrency"] = self.max_concurrency
+        stats["circuit"] = self.breaker.get_stats()
+        if self._admission is not None:
+            stats["queue"] = self._admission.get_stats()
+        return stats
+
+
+# Singleton instance
+ollama_client = OllamaClient(
+    base_url=settings.OLLAMA_URL,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout=settings.LLM_TIMEOUT,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    breaker=CircuitBreaker(settings.LLM_FAILURE_THRESHOLD, settings.LLM_RESET_SECONDS),
+    max_queue=settings.LLM_MAX_QUEUE
+)
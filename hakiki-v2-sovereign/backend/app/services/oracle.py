@@ -2,19 +2,159 @@
 Whistleblower Oracle for HAKIKI AI v2.0
 Hybrid Engine: Tries LLM first, falls back to deterministic keyword analysis.
 """
-import requests
+import asyncio
+import hashlib
+import json
 import re
-import random
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.llm_client import ollama_client, LLMUnavailableError, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from app.utils.lru_cache import LRUCache
+from app.utils.name_index import payroll_name_index
+
+
+# Fraud type rules, checked in priority order (first match wins)
+FRAUD_RULES = [
+    ("Ghost Worker Ring", ("ghost", "doesn't exist", "fake")),
+    ("Bribery / Corruption", ("bribe", "kickback", "paid off")),
+    ("Nepotism / Hiring Fraud", ("cousin", "relative", "nepotism", "brother")),
+    ("Salary Padding", ("salary", "earning", "paid too much")),
+    ("Asset Theft", ("steal", "stealing", "theft")),
+    ("Living Dead Fraud", ("dead", "deceased", "passed away")),
+    ("Double Dipping", ("double", "twice", "two places")),
+]
+DEFAULT_FRAUD_TYPE = "Unspecified Suspicion"
+
+# Capitalized words that are not names
+EXCLUDE_WORDS = {
+    "i", "the", "he", "she", "they", "department", "manager", "hr", "finance",
+    "ministry", "county", "government", "please", "help", "someone", "about",
+    "there", "this", "that", "with", "from", "been", "have", "has", "who"
+}
+NAME_STRIP_CHARS = ".,!?\"'"
+NAME_SPAN_BREAKS = ".,!?;:"  # Punctuation that ends a multi-word name
+
+# Names per tip resolved against the payroll, and candidates kept per name
+MAX_RESOLVED_NAMES = 3
+PAYROLL_CANDIDATES = 3
+NAME_INDEX_RETRY_SECONDS = 60  # Wait between attempts while the dataset is missing or unreadable
+
+DEPT_KEYWORDS = ["hr", "finance", "procurement", "accounting", "admin", "ict", "legal"]
+
+# Severity keywords -> risk points on top of the base score
+BASE_RISK_SCORE = 75
+RISK_RULES = [
+    (("millions", "billion"), 20),
+    (("years", "long time"), 10),
+    (("many", "multiple"), 5),
+]
+
+NEXT_STEPS = [
+    "Cross-reference subject with payroll database",
+    "Flag related bank accounts for monitoring",
+    "Schedule unannounced department audit"
+]
+
+# Keyword-engine risk scores vary by up to this many points per tip
+MAX_RISK_JITTER = 10
+
+# LLM analyses keyed by (model, tip digest)
+oracle_cache = LRUCache(settings.ORACLE_CACHE_SIZE, settings.ORACLE_CACHE_TTL)
+
+
+def tip_digest(text: str) -> str:
+    """
+    SHA-256 of the normalized tip (case-folded, whitespace collapsed), so
+    copy-pasted complaints and form resubmissions share one digest.
+    """
+    normalized = " ".join(str(text).split()).casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _risk_jitter(digest: str) -> int:
+    """Per-tip risk score jitter, fixed by the tip digest."""
+    return int(digest[:8], 16) % (MAX_RISK_JITTER + 1)
+
+
+_name_index_lock = threading.Lock()
+_name_index_failed_at: Optional[float] = None
+
+
+def _ensure_name_index() -> bool:
+    """
+    Build the payroll name index from the dataset if it isn't loaded yet (audit
+    runs rebuild it). Blocking: call through load_name_index() from async code.
+    A failed load is retried after NAME_INDEX_RETRY_SECONDS.
+    """
+    global _name_index_failed_at
+    with _name_index_lock:
+        if payroll_name_index.loaded:
+            return True
+        if _name_index_failed_at is not None and time.monotonic() - _name_index_failed_at < NAME_INDEX_RETRY_SECONDS:
+            return False
+        path = settings.get_dataset_path()
+        try:
+            payroll_name_index.load_csv(path)
+            _name_index_failed_at = None
+        except (OSError, ValueError) as e:
+            _name_index_failed_at = time.monotonic()
+            print(f"[ORACLE] Payroll name index unavailable: {e}")
+        return payroll_name_index.loaded
+
+
+async def load_name_index() -> bool:
+    """Build the payroll name index in a worker thread, off the event loop."""
+    if payroll_name_index.loaded:
+        return True
+    return await asyncio.to_thread(_ensure_name_index)
+
+
+class _JoinedBatch:
+    """Many texts joined into one buffer so each keyword is searched once for the whole batch."""
+
+    SEPARATOR = "\x00"
+
+    def __init__(self, texts: List[str]):
+        self.size = len(texts)
+        self.buffer = self.SEPARATOR.join(texts)
+        self.starts, self.ends = [], []
+        pos = 0
+        for text in texts:
+            self.starts.append(pos)
+            pos += len(text)
+            self.ends.append(pos)
+            pos += 1
+
+    def contains_any(self, terms) -> np.ndarray:
+        """Boolean per text: does it contain any of `terms`."""
+        hits = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            pos = self.buffer.find(term)
+            while pos != -1:
+                i = bisect_right(self.starts, pos) - 1
+                hits[i] = True
+                # Skip the rest of this text; one hit is enough
+                pos = self.buffer.find(term, self.ends[i])
+        return hits
 
 
 class WhistleblowerOracle:
     """
     AI-powered tip analyzer with graceful fallback for demo reliability.
+    LLM calls go through the shared pooled client; while its circuit is open
+    tips go straight to the keyword engine.
     """
-    OLLAMA_URL = "http://localhost:11434/api/generate"
+    MODEL = settings.ORACLE_MODEL
 
     @staticmethod
-    def analyze_tip(text: str):
+    async def analyze_tip(text: str):
         """
         Hybrid Analysis: Tries LLM first, falls back to Keyword Logic for reliability.
         
@@ -25,95 +165,135 @@ class WhistleblowerOracle:
             Analysis result with fraud type, entities, and recommendations
         """
         print(f"[ORACLE] Analyzing tip: {text[:50]}...")
+        digest = tip_digest(text)
+        cache_key = (WhistleblowerOracle.MODEL, digest)
+        cached = oracle_cache.get(cache_key)
+        if cached is not None:
+            print("[ORACLE] Cache hit")
+            return await WhistleblowerOracle._with_payroll_matches(dict(cached), text)
         
         # 1. Try Local LLM (Ollama) - Short timeout for demo
         try:
-            prompt = f"Extract entities (Person, Dept) and Fraud Type from: '{text}'. Return JSON."
-            payload = {
-                "model": "llama3",
-                "prompt": prompt,
-                "stream": False,
-                "format": "json"
-            }
-            response = requests.post(
-                WhistleblowerOracle.OLLAMA_URL, 
-                json=payload, 
-                timeout=2  # Short timeout to not block demo
-            )
-            if response.status_code == 200:
-                result = response.json().get('response', {})
+            result = await WhistleblowerOracle._llm_analysis(text)
+            if result is not None:
                 print("[ORACLE] LLM analysis successful")
-                return {
-                    "analysis_type": "OLLAMA_LLM",
-                    **result
-                }
-        except Exception as e:
+                oracle_cache.put(cache_key, result)
+                return await WhistleblowerOracle._with_payroll_matches(dict(result), text)
+            print("[ORACLE] LLM returned non-object JSON, using fallback")
+        except LLMUnavailableError as e:
             print(f"[ORACLE] LLM unavailable, using fallback: {e}")
 
         # 2. Fallback: Deterministic Keyword Engine (The "Demo Saver")
-        return WhistleblowerOracle._keyword_analysis(text)
+        # Not cached, so the tip gets another LLM attempt next time
+        result = WhistleblowerOracle._keyword_analysis(text, digest)
+        return await WhistleblowerOracle._with_payroll_matches(result, text)
+
+    @staticmethod
+    async def _llm_analysis(text: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        """
+        One LLM extraction. Returns None if the model's reply is not a JSON object.
+        Batch work passes PRIORITY_BATCH so interactive calls are admitted first.
+
+        Raises:
+            LLMUnavailableError: if the shared client cannot serve the request
+        """
+        prompt = f"Extract entities (Person, Dept) and Fraud Type from: '{text}'. Return JSON."
+        response = await ollama_client.generate(WhistleblowerOracle.MODEL, prompt, format="json", priority=priority)
+        try:
+            result = json.loads(response)
+        except ValueError:
+            return None
+        if not isinstance(result, dict):
+            return None
+        return {
+            "analysis_type": "OLLAMA_LLM",
+            **result
+        }
 
     @staticmethod
-    def _keyword_analysis(text: str):
+    def _keyword_analysis(text: str, digest: Optional[str] = None):
         """
         Fallback keyword-based analysis when LLM is offline.
         Uses regex and heuristics to extract intelligence.
+        The same tip always gets the same risk score.
         """
         print("[ORACLE] Using HAKIKI Fallback Engine...")
         text_lower = text.lower()
         
         # Detect Fraud Type from keywords
-        fraud_type = "Unspecified Suspicion"
-        if "ghost" in text_lower or "doesn't exist" in text_lower or "fake" in text_lower:
-            fraud_type = "Ghost Worker Ring"
-        elif "bribe" in text_lower or "kickback" in text_lower or "paid off" in text_lower:
-            fraud_type = "Bribery / Corruption"
-        elif "cousin" in text_lower or "relative" in text_lower or "nepotism" in text_lower or "brother" in text_lower:
-            fraud_type = "Nepotism / Hiring Fraud"
-        elif "salary" in text_lower or "earning" in text_lower or "paid too much" in text_lower:
-            fraud_type = "Salary Padding"
-        elif "steal" in text_lower or "stealing" in text_lower or "theft" in text_lower:
-            fraud_type = "Asset Theft"
-        elif "dead" in text_lower or "deceased" in text_lower or "passed away" in text_lower:
-            fraud_type = "Living Dead Fraud"
-        elif "double" in text_lower or "twice" in text_lower or "two places" in text_lower:
-            fraud_type = "Double Dipping"
+        fraud_type = DEFAULT_FRAUD_TYPE
+        for candidate, terms in FRAUD_RULES:
+            if any(term in text_lower for term in terms):
+                fraud_type = candidate
+                break
         
         # Extract potential names (Capitalized words that aren't common words)
-        exclude_words = {
-            "i", "the", "he", "she", "they", "department", "manager", "hr", "finance",
-            "ministry", "county", "government", "please", "help", "someone", "about",
-            "there", "this", "that", "with", "from", "been", "have", "has", "who"
-        }
-        
-        words = text.split()
-        potential_names = []
-        for word in words:
-            clean_word = word.strip(".,!?\"'")
-            if len(clean_word) > 1 and clean_word[0].isupper() and clean_word.lower() not in exclude_words:
-                potential_names.append(clean_word)
+        potential_names, _ = WhistleblowerOracle._extract_names(text)
         
         # Extract department mentions
         departments = []
-        dept_keywords = ["hr", "finance", "procurement", "accounting", "admin", "ict", "legal"]
-        for dept in dept_keywords:
+        for dept in DEPT_KEYWORDS:
             if dept in text_lower:
                 departments.append(dept.upper())
         
+        # Generate risk score based on severity keywords
+        risk_score = BASE_RISK_SCORE
+        for terms, points in RISK_RULES:
+            if any(term in text_lower for term in terms):
+                risk_score += points
+        risk_score = min(risk_score + _risk_jitter(digest or tip_digest(text)), 99)
+        
+        return WhistleblowerOracle._fallback_result(fraud_type, potential_names, departments, risk_score)
+
+    @staticmethod
+    def _extract_names(text: str):
+        """
+        Capitalized words that aren't common words, plus the runs of them that
+        read as full names ("John Kamau in HR" -> ["John", "Kamau"], ["John Kamau"]).
+        """
+        potential_names, spans, current = [], [], []
+        for word in text.split():
+            clean_word = word.strip(NAME_STRIP_CHARS)
+            if len(clean_word) > 1 and clean_word[0].isupper() and clean_word.lower() not in EXCLUDE_WORDS:
+                potential_names.append(clean_word)
+                current.append(clean_word)
+                if word.rstrip("\"')")[-1:] not in NAME_SPAN_BREAKS:
+                    continue
+            if current:
+                spans.append(" ".join(current))
+                current = []
+        if current:
+            spans.append(" ".join(current))
+        return potential_names, spans
+
+    @staticmethod
+    def _payroll_matches(text: str) -> List[Dict[str, Any]]:
+        """Names in the tip resolved to ranked payroll candidates (none until the index is loaded)."""
+        if not payroll_name_index.loaded:
+            return []
+        _, spans = WhistleblowerOracle._extract_names(text)
+        matches = []
+        for span in list(dict.fromkeys(spans))[:MAX_RESOLVED_NAMES]:
+            candidates = payroll_name_index.resolve(span, limit=PAYROLL_CANDIDATES)
+            matches.append({
+                "name": span,
+                "candidates": [{k: v for k, v in c.items() if k != "row"} for c in candidates]
+            })
+        return matches
+
+    @staticmethod
+    async def _with_payroll_matches(result: Dict[str, Any], text: str) -> Dict[str, Any]:
+        await load_name_index()
+        result["payroll_matches"] = WhistleblowerOracle._payroll_matches(text)
+        return result
+
+    @staticmethod
+    def _fallback_result(fraud_type: str, potential_names: List[str], departments: List[str],
+                         risk_score: int) -> Dict[str, Any]:
         subject = potential_names[0] if potential_names else "Unknown Subject"
         entities = potential_names[:3] if potential_names else ["Unknown"]
         if departments:
-            entities.extend(departments)
-        
-        # Generate risk score based on severity keywords
-        risk_score = 75
-        if "millions" in text_lower or "billion" in text_lower:
-            risk_score += 20
-        if "years" in text_lower or "long time" in text_lower:
-            risk_score += 10
-        if "many" in text_lower or "multiple" in text_lower:
-            risk_score += 5
-        risk_score = min(risk_score + random.randint(0, 10), 99)
+            entities = entities + departments
         
         return {
             "analysis_type": "HAKIKI_FALLBACK_ENGINE",
@@ -124,9 +304,132 @@ class WhistleblowerOracle:
             "risk_score": risk_score,
             "confidence": "MEDIUM" if len(potential_names) > 0 else "LOW",
             "recommendation": "Immediate Forensic Audit Recommended",
-            "next_steps": [
-                "Cross-reference subject with payroll database",
-                "Flag related bank accounts for monitoring",
-                "Schedule unannounced department audit"
-            ]
+            "next_steps": list(NEXT_STEPS)
         }
+
+    @staticmethod
+    def keyword_analysis_batch(texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Batch keyword engine: same rules and output as _keyword_analysis, but
+        each keyword is searched once across the whole batch (joined into one
+        buffer) instead of once per tip, and nothing is logged per tip.
+        """
+        if not texts:
+            return []
+        texts = [str(text) for text in texts]
+        batch = _JoinedBatch([text.lower() for text in texts])
+
+        fraud_types = np.select(
+            [batch.contains_any(terms) for _, terms in FRAUD_RULES],
+            [name for name, _ in FRAUD_RULES],
+            default=DEFAULT_FRAUD_TYPE
+        )
+        dept_hits = np.column_stack([batch.contains_any((dept,)) for dept in DEPT_KEYWORDS])
+        dept_labels = [dept.upper() for dept in DEPT_KEYWORDS]
+
+        risk = np.full(len(texts), BASE_RISK_SCORE, dtype=np.int64)
+        for terms, points in RISK_RULES:
+            risk += np.where(batch.contains_any(terms), points, 0)
+
+        results = []
+        for i, text in enumerate(texts):
+            potential_names, _ = WhistleblowerOracle._extract_names(text)
+            departments = [label for label, hit in zip(dept_labels, dept_hits[i]) if hit]
+            risk_score = min(int(risk[i]) + _risk_jitter(tip_digest(text)), 99)
+            results.append(WhistleblowerOracle._fallback_result(
+                str(fraud_types[i]), potential_names, departments, risk_score
+            ))
+        return results
+
+    @staticmethod
+    async def analyze_batch(texts: List[str], use_llm: bool = True, fallback_chunk: int = 1000,
+                            resolve_names: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze many tips, yielding {"index": i, **analysis} as each completes.
+
+        Repeated tips (same normalized text) are analyzed once, and tips already
+        in the oracle cache are answered first. One LLM worker per slot of the
+        shared client keeps the model server saturated. Tips the LLM cannot take
+        (busy, bad reply, circuit open) go to the vectorized keyword engine;
+        once the circuit opens, every remaining tip does.
+
+        resolve_names adds payroll_matches to every analysis (up to about a
+        millisecond per tip for common names, so it is off for backfills).
+        """
+        def item(i: int, analysis: Dict[str, Any]) -> Dict[str, Any]:
+            result = {"index": i, **analysis}
+            if resolve_names:
+                result["payroll_matches"] = WhistleblowerOracle._payroll_matches(texts[i])
+            return result
+
+        if resolve_names:
+            await load_name_index()
+        fallback: List[int] = []
+        results: asyncio.Queue = asyncio.Queue()
+
+        groups: Dict[str, List[int]] = {}
+        if use_llm:
+            for i, text in enumerate(texts):
+                groups.setdefault(tip_digest(text), []).append(i)
+        else:
+            fallback.extend(range(len(texts)))
+        pending = deque()
+        for digest, indices in groups.items():
+            cached = oracle_cache.get((WhistleblowerOracle.MODEL, digest))
+            if cached is None:
+                pending.append((digest, indices))
+                continue
+            for i in indices:
+                yield item(i, cached)
+
+        async def llm_worker():
+            while pending:
+                if ollama_client.breaker.state == "OPEN":
+                    for _, indices in pending:
+                        fallback.extend(indices)
+                    pending.clear()
+                    return
+                digest, indices = pending.popleft()
+                try:
+                    result = await WhistleblowerOracle._llm_analysis(texts[indices[0]], priority=PRIORITY_BATCH)
+                except LLMUnavailableError:
+                    result = None
+                if result is None:
+                    fallback.extend(indices)
+                    continue
+                oracle_cache.put((WhistleblowerOracle.MODEL, digest), result)
+                for i in indices:
+                    await results.put(item(i, result))
+
+        workers = []
+        if pending and ollama_client.breaker.state != "OPEN":
+            workers = [asyncio.create_task(llm_worker()) for _ in range(min(ollama_client.max_concurrency, len(pending)))]
+        else:
+            for _, indices in pending:
+                fallback.extend(indices)
+            pending.clear()
+
+        done = asyncio.gather(*workers)
+        try:
+            while not (done.done() and results.empty()):
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            await done
+
+            for start in range(0, len(fallback), fallback_chunk):
+                chunk = fallback[start:start + fallback_chunk]
+                analyses = WhistleblowerOracle.keyword_analysis_batch([texts[i] for i in chunk])
+                for i, analysis in zip(chunk, analyses):
+                    yield item(i, analysis)
+                await asyncio.sleep(0)
+        finally:
+            # Client gone or consumer stopped early: stop the workers and wait for them
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if done.done() and not done.cancelled():
+                done.exception()  # Retrieved, so asyncio doesn't log it as unhandled
@@ -5,7 +5,52 @@ Generates legally formatted Stop Payment Orders for salary freezing.
 from fpdf import FPDF
 from datetime import datetime
 import os
+import threading
 from pathlib import Path
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+def _pdf_bytes(pdf: FPDF) -> bytes:
+    """Serialize a finished document in memory (fpdf returns str, fpdf2 bytearray)."""
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+LEGAL_BASIS_TEXT = (
+    "Pursuant to Section 4 of the Public Finance Management Act, 2012, "
+    "and Section 68 of the Constitution of Kenya, the Auditor General hereby "
+    "orders the immediate suspension of salary payments to the individual named below, "
+    "pending investigation of suspected payroll fraud."
+)
+
+ACTION_REQUIRED_TEXT = (
+    "1. The Accounting Officer shall immediately suspend all salary payments to the named individual.\n"
+    "2. The Human Resources Department shall place the employee on administrative leave.\n"
+    "3. The Ethics and Anti-Corruption Commission (EACC) shall be notified within 48 hours.\n"
+    "4. All relevant payroll records shall be preserved for forensic audit."
+)
+
+DETAIL_LABELS = ("Full Name", "National ID", "Employee ID", "Job Group", "Department", "Monthly Salary (KES)")
+
+DEFAULT_FRAUD_REASON = "Salary Padding - Statistical anomaly detected by ML analysis"
+
+
+def render_stop_orders(suspects: List[dict], timestamp: Optional[datetime] = None) -> List[Tuple[str, bytes]]:
+    """
+    Render a chunk of Stop Orders in memory.
+    Module-level so it can be shipped to a process pool by the bulk pipeline.
+    
+    Returns:
+        (employee_id, pdf_bytes) per suspect, in input order
+    """
+    generator = StopOrderGenerator()
+    return [
+        (str(suspect.get("employee_id", "UNKNOWN")), generator.render_pdf(suspect, timestamp))
+        for suspect in suspects
+    ]
 
 
 class StopOrderGenerator:
@@ -15,8 +60,7 @@ class StopOrderGenerator:
     """
     
     def __init__(self):
-        self.output_dir = Path(__file__).parent.parent.parent / "data" / "stop_orders"
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = Path(settings.DATA_DIR) / "stop_orders"  # Created by create_pdf()
     
     def create_pdf(self, suspect: dict) -> str:
         """
@@ -35,117 +79,295 @@ class StopOrderGenerator:
         Returns:
             Path to the generated PDF file
         """
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        
-        # Header - Republic of Kenya
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, "REPUBLIC OF KENYA", ln=True, align="C")
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 8, "OFFICE OF THE AUDITOR GENERAL", ln=True, align="C")
-        pdf.ln(5)
-        
-        # Horizontal line
-        pdf.set_draw_color(0, 100, 0)
-        pdf.set_line_width(1)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(10)
-        
-        # Title
-        pdf.set_font("Arial", "B", 18)
-        pdf.set_text_color(180, 0, 0)
-        pdf.cell(0, 12, "STOP PAYMENT ORDER", ln=True, align="C")
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 8, "- IMMEDIATE EFFECT -", ln=True, align="C")
-        pdf.set_text_color(0, 0, 0)
-        pdf.ln(10)
-        
-        # Reference and Date
         timestamp = datetime.now()
-        ref_number = f"HAKIKI/SPO/{timestamp.strftime('%Y%m%d')}/{suspect.get('employee_id', 'UNKNOWN')[-6:]}"
-        
-        pdf.set_font("Arial", "", 11)
-        pdf.cell(0, 6, f"Reference: {ref_number}", ln=True)
-        pdf.cell(0, 6, f"Date: {timestamp.strftime('%d %B %Y')}", ln=True)
-        pdf.ln(8)
-        
-        # Legal Basis
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 6, "LEGAL BASIS:", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.multi_cell(0, 5, 
-            "Pursuant to Section 4 of the Public Finance Management Act, 2012, "
-            "and Section 68 of the Constitution of Kenya, the Auditor General hereby "
-            "orders the immediate suspension of salary payments to the individual named below, "
-            "pending investigation of suspected payroll fraud."
-        )
-        pdf.ln(8)
-        
-        # Suspect Details Table
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 6, "SUBJECT OF ORDER:", ln=True)
-        pdf.ln(3)
-        
-        # Table header
-        pdf.set_fill_color(240, 240, 240)
-        pdf.set_font("Arial", "B", 10)
-        
-        details = [
-            ("Full Name", suspect.get("full_name", "N/A")),
-            ("National ID", suspect.get("national_id", "N/A")),
-            ("Employee ID", suspect.get("employee_id", "N/A")),
-            ("Job Group", suspect.get("job_group", "N/A")),
-            ("Department", suspect.get("department", "N/A")),
-            ("Monthly Salary (KES)", f"{suspect.get('amount_at_risk', 0):,.2f}"),
-        ]
-        
-        for label, value in details:
-            pdf.set_font("Arial", "B", 10)
-            pdf.cell(60, 8, label, border=1, fill=True)
-            pdf.set_font("Arial", "", 10)
-            pdf.cell(0, 8, str(value), border=1, ln=True)
-        
-        pdf.ln(8)
-        
-        # Fraud Details
-        pdf.set_font("Arial", "B", 11)
-        pdf.set_text_color(180, 0, 0)
-        pdf.cell(0, 6, "FRAUD CLASSIFICATION:", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", "", 10)
-        
-        fraud_reason = suspect.get("fraud_reason", "Salary Padding - Statistical anomaly detected by ML analysis")
-        pdf.multi_cell(0, 5, fraud_reason)
-        pdf.ln(8)
-        
-        # Action Required
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 6, "ACTION REQUIRED:", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.multi_cell(0, 5,
-            "1. The Accounting Officer shall immediately suspend all salary payments to the named individual.\n"
-            "2. The Human Resources Department shall place the employee on administrative leave.\n"
-            "3. The Ethics and Anti-Corruption Commission (EACC) shall be notified within 48 hours.\n"
-            "4. All relevant payroll records shall be preserved for forensic audit."
-        )
-        pdf.ln(10)
-        
-        # Footer
-        pdf.set_draw_color(0, 100, 0)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
-        
-        pdf.set_font("Arial", "I", 9)
-        pdf.set_text_color(100, 100, 100)
-        pdf.cell(0, 5, f"Generated by HAKIKI AI Sovereign Engine", ln=True, align="C")
-        pdf.cell(0, 5, f"Timestamp: {timestamp.strftime('%Y-%m-%d %H:%M:%S EAT')}", ln=True, align="C")
-        pdf.cell(0, 5, "This document is computer-generated and requires authorized signature.", ln=True, align="C")
+        pdf = self._build_document(suspect, timestamp)
         
         # Save PDF
         filename = f"StopOrder_{suspect.get('employee_id', 'UNKNOWN')}_{timestamp.strftime('%Y%m%d_%H%M%S')}.pdf"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         filepath = self.output_dir / filename
         pdf.output(str(filepath))
         
         print(f"[SUCCESS] Stop Order generated: {filepath}")
         return str(filepath)
+    
+    def render_pdf(self, suspect: dict, timestamp: Optional[datetime] = None) -> bytes:
+        """Generate a Stop Payment Order PDF in memory (nothing written to disk)."""
+        return _pdf_bytes(self._build_document(suspect, timestamp or datetime.now()))
+    
+    def _build_document(self, suspect: dict, timestamp: datetime) -> FPDF:
+        """Stop Order for one suspect: cached template when fpdf supports it, full layout otherwise."""
+        template = _get_template()
+        if template is not None:
+            return template.fill(suspect, timestamp)
+        return self._layout_document(suspect, timestamp)
+    
+    def _layout_document(self, suspect: dict, timestamp: datetime) -> FPDF:
+        """Lay out the full Stop Payment Order for one suspect from scratch."""
+        pdf = _new_document()
+        _draw_header(pdf)
+        _draw_reference(pdf, suspect, timestamp)
+        _draw_legal_basis(pdf)
+        _draw_subject_heading(pdf)
+        _draw_detail_labels(pdf)
+        _draw_detail_values(pdf, suspect)
+        _draw_fraud_heading(pdf)
+        _draw_fraud_reason(pdf, suspect)
+        _draw_action_required(pdf)
+        _draw_footer_banner(pdf)
+        _draw_footer_timestamp(pdf, timestamp)
+        return pdf
+
+
+# ============ LAYOUT SECTIONS ============
+
+def _new_document() -> FPDF:
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
+
+
+def _draw_header(pdf: FPDF):
+    # Header - Republic of Kenya
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "REPUBLIC OF KENYA", ln=True, align="C")
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 8, "OFFICE OF THE AUDITOR GENERAL", ln=True, align="C")
+    pdf.ln(5)
+    
+    # Horizontal line
+    pdf.set_draw_color(0, 100, 0)
+    pdf.set_line_width(1)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(10)
+    
+    # Title
+    pdf.set_font("Arial", "B", 18)
+    pdf.set_text_color(180, 0, 0)
+    pdf.cell(0, 12, "STOP PAYMENT ORDER", ln=True, align="C")
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 8, "- IMMEDIATE EFFECT -", ln=True, align="C")
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(10)
+
+
+def reference_number(suspect: dict, timestamp: datetime) -> str:
+    """Stop Order reference: one per suspect per day."""
+    return f"HAKIKI/SPO/{timestamp.strftime('%Y%m%d')}/{suspect.get('employee_id', 'UNKNOWN')[-6:]}"
+
+
+def _draw_reference(pdf: FPDF, suspect: dict, timestamp: datetime):
+    # Reference and Date
+    ref_number = reference_number(suspect, timestamp)
+    
+    pdf.set_font("Arial", "", 11)
+    pdf.cell(0, 6, f"Reference: {ref_number}", ln=True)
+    pdf.cell(0, 6, f"Date: {timestamp.strftime('%d %B %Y')}", ln=True)
+    pdf.ln(8)
+
+
+def _draw_legal_basis(pdf: FPDF):
+    # Legal Basis
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, "LEGAL BASIS:", ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 5, LEGAL_BASIS_TEXT)
+    pdf.ln(8)
+    
+
+def _draw_subject_heading(pdf: FPDF):
+    # Suspect Details Table
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, "SUBJECT OF ORDER:", ln=True)
+    pdf.ln(3)
+
+
+def _draw_detail_labels(pdf: FPDF):
+    """Shaded label column; leaves the cursor at the top-left of the table."""
+    top = pdf.get_y()
+    pdf.set_fill_color(240, 240, 240)
+    pdf.set_font("Arial", "B", 10)
+    for label in DETAIL_LABELS:
+        pdf.cell(60, 8, label, border=1, fill=True, ln=2)
+    pdf.set_xy(pdf.l_margin, top)
+
+
+def _draw_detail_values(pdf: FPDF, suspect: dict):
+    values = [
+        suspect.get("full_name", "N/A"),
+        suspect.get("national_id", "N/A"),
+        suspect.get("employee_id", "N/A"),
+        suspect.get("job_group", "N/A"),
+        suspect.get("department", "N/A"),
+        f"{suspect.get('amount_at_risk', 0):,.2f}",
+    ]
+    pdf.set_font("Arial", "", 10)
+    for value in values:
+        pdf.set_x(pdf.l_margin + 60)
+        pdf.cell(0, 8, str(value), border=1, ln=True)
+    
+    pdf.ln(8)
+
+
+def _draw_fraud_heading(pdf: FPDF):
+    # Fraud Details
+    pdf.set_font("Arial", "B", 11)
+    pdf.set_text_color(180, 0, 0)
+    pdf.cell(0, 6, "FRAUD CLASSIFICATION:", ln=True)
+    pdf.set_text_color(0, 0, 0)
+
+
+def _draw_fraud_reason(pdf: FPDF, suspect: dict):
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 5, suspect.get("fraud_reason", DEFAULT_FRAUD_REASON))
+    pdf.ln(8)
+
+
+def _draw_action_required(pdf: FPDF):
+    # Action Required
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, "ACTION REQUIRED:", ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 5, ACTION_REQUIRED_TEXT)
+    pdf.ln(10)
+    
+
+def _draw_footer_banner(pdf: FPDF):
+    # Footer
+    pdf.set_draw_color(0, 100, 0)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(5)
+    
+    pdf.set_font("Arial", "I", 9)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 5, "Generated by HAKIKI AI Sovereign Engine", ln=True, align="C")
+
+
+def _draw_footer_timestamp(pdf: FPDF, timestamp: datetime):
+    pdf.cell(0, 5, f"Timestamp: {timestamp.strftime('%Y-%m-%d %H:%M:%S EAT')}", ln=True, align="C")
+    pdf.cell(0, 5, "This document is computer-generated and requires authorized signature.", ln=True, align="C")
+
+
+# ============ CACHED TEMPLATE ============
+
+class _StopOrderTemplate:
+    """
+    Static sections of the Stop Order laid out once and replayed as raw page
+    content. Each section is recorded in a scratch document together with the
+    fpdf state it leaves behind, so a filled order carries the exact content
+    stream the full layout would produce; only the suspect fields, dates and
+    the fraud reason go through fpdf's layout code per document.
+    
+    Relies on PyFPDF 1.7 internals (string page buffers); _get_template()
+    returns None on other fpdf versions and the full layout is used instead.
+    """
+    
+    STATE_KEYS = (
+        "x", "y", "lasth", "font_family", "font_style", "font_size_pt", "font_size",
+        "underline", "text_color", "fill_color", "draw_color", "line_width", "color_flag"
+    )
+    MAX_CLOSING_OFFSETS = 64  # Distinct fraud-reason heights kept
+    
+    def __init__(self):
+        sample = {"employee_id": "UNKNOWN", "fraud_reason": DEFAULT_FRAUD_REASON}
+        stamp = datetime.now()
+        
+        pdf = _new_document()
+        self.header = self._record(pdf, _draw_header)
+        _draw_reference(pdf, sample, stamp)
+        self.legal_basis = self._record(pdf, _draw_legal_basis)
+        self.subject_heading = self._record(pdf, _draw_subject_heading)
+        self.detail_labels = self._record(pdf, _draw_detail_labels)
+        _draw_detail_values(pdf, sample)
+        self.fraud_heading = self._record(pdf, _draw_fraud_heading)
+        _draw_fraud_reason(pdf, sample)
+        self._record(pdf, _draw_action_required, _draw_footer_banner)
+        
+        # Every font the layout uses, with the object indices the recorded content refers to
+        self.fonts = pdf.fonts
+        # Action Required + footer banner sit below the variable-height fraud reason: one recording per y
+        self._closing: Dict[float, Optional[Tuple[str, Dict[str, Any]]]] = {}
+        self._closing_lock = threading.Lock()  # fill() runs concurrently in the API threadpool
+    
+    def _record(self, pdf: FPDF, *sections) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Run layout sections, returning (content ops, fpdf state after them); None if they broke the page."""
+        page = pdf.page
+        start = len(pdf.pages[page])
+        for section in sections:
+            section(pdf)
+        if pdf.page != page:
+            return None
+        state = {key: getattr(pdf, key) for key in self.STATE_KEYS}
+        state["font_key"] = pdf.font_family + pdf.font_style
+        return pdf.pages[page][start:], state
+    
+    @staticmethod
+    def _replay(pdf: FPDF, segment: Tuple[str, Dict[str, Any]]):
+        ops, state = segment
+        pdf.pages[pdf.page] += ops
+        for key, value in state.items():
+            if key != "font_key":
+                setattr(pdf, key, value)
+        pdf.current_font = pdf.fonts[state["font_key"]]
+    
+    def _new_document(self) -> FPDF:
+        pdf = FPDF()
+        # Register the fonts up front, with the same /F indices as the recording
+        pdf.fonts = {key: dict(font) for key, font in self.fonts.items()}
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        return pdf
+    
+    def _closing_segment(self, y: float):
+        """Recorded Action Required + footer banner starting at height y (None if it would break the page)."""
+        key = round(y, 4)
+        with self._closing_lock:
+            if key in self._closing:
+                return self._closing[key]
+        pdf = self._new_document()
+        self._replay(pdf, self.fraud_heading)
+        pdf.set_font("Arial", "", 10)
+        pdf.set_xy(pdf.l_margin, y)
+        segment = self._record(pdf, _draw_action_required, _draw_footer_banner)
+        with self._closing_lock:
+            if len(self._closing) >= self.MAX_CLOSING_OFFSETS:
+                self._closing.clear()
+            self._closing[key] = segment
+        return segment
+    
+    def fill(self, suspect: dict, timestamp: datetime) -> FPDF:
+        """Stop Order for one suspect built from the cached sections."""
+        pdf = self._new_document()
+        self._replay(pdf, self.header)
+        _draw_reference(pdf, suspect, timestamp)
+        self._replay(pdf, self.legal_basis)
+        self._replay(pdf, self.subject_heading)
+        self._replay(pdf, self.detail_labels)
+        _draw_detail_values(pdf, suspect)
+        self._replay(pdf, self.fraud_heading)
+        _draw_fraud_reason(pdf, suspect)
+        
+        segment = self._closing_segment(pdf.get_y()) if pdf.x == pdf.l_margin else None
+        if segment is not None:
+            self._replay(pdf, segment)
+        else:
+            _draw_action_required(pdf)
+            _draw_footer_banner(pdf)
+        
+        _draw_footer_timestamp(pdf, timestamp)
+        return pdf
+
+
+@lru_cache(maxsize=1)
+def _get_template() -> Optional[_StopOrderTemplate]:
+    """Per-process template; None when the installed fpdf lacks string page buffers."""
+    try:
+        probe = FPDF()
+        probe.add_page()
+        if not isinstance(probe.pages.get(1), str):
+            return None
+        return _StopOrderTemplate()
+    except Exception as e:
+        print(f"[WARNING] Stop Order template unavailable, using full layout: {e}")
+        return None
@@ -0,0 +1,164 @@
+"""
+Selfie Replay Guard for HAKIKI AI v2.0
+DCT perceptual hashes of Sentinel selfies, indexed in a multi-index hash table
+so near-duplicate photos replayed across employees or days are caught in milliseconds.
+"""
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+
+HASH_BITS = 64
+CHUNK_BITS = 16
+NUM_CHUNKS = HASH_BITS // CHUNK_BITS
+
+# Probing each 16-bit chunk exactly plus all 1-bit flips finds every stored hash
+# within Hamming distance 2 * NUM_CHUNKS - 1 = 7 (pigeonhole over the 4 chunks).
+MAX_SEARCH_DISTANCE = 2 * NUM_CHUNKS - 1
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n: int = 32) -> np.ndarray:
+    """Orthonormal DCT-II basis (n x n)."""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+def perceptual_hashes(stack: np.ndarray) -> np.ndarray:
+    """
+    64-bit pHash for each greyscale image in an (N, H, W) stack.
+    Mean-pools to 32x32, takes the 8x8 lowest DCT frequencies and sets a bit
+    for every coefficient above the median of the non-DC coefficients.
+    """
+    n, h, w = stack.shape
+    pooled = stack.reshape(n, 32, h // 32, 32, w // 32).mean(axis=(2, 4))
+    dct = _dct_matrix(32)
+    coeffs = (dct @ pooled @ dct.T)[:, :8, :8].reshape(n, 64)
+    medians = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(coeffs > medians, axis=1)
+    return bits.view('>u8').ravel().astype(np.uint64)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ReplayHashIndex:
+    """
+    Multi-index hash table over 64-bit perceptual hashes.
+    Each hash is split into four 16-bit chunks with one bucket table per chunk.
+    Memory is bounded by MAX_ENTRIES, and entries expire after the time window.
+    """
+
+    MAX_ENTRIES = 200_000
+    WINDOW_SECONDS = 7 * 24 * 3600  # Replays across a week of check-ins
+    MAX_DISTANCE = 6  # Hamming bits for "near-duplicate"
+    SAME_EMPLOYEE_GAP_SECONDS = 3600  # Retakes by the same person within an hour are fine
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, window_seconds: float = WINDOW_SECONDS,
+                 max_distance: int = MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.window_seconds = window_seconds
+        self.max_distance = min(max_distance, MAX_SEARCH_DISTANCE)
+        self._lock = threading.Lock()
+        self._tables: List[Dict[int, set]] = [dict() for _ in range(NUM_CHUNKS)]
+        self._entries: Dict[int, tuple] = {}  # entry_id -> (hash, employee_id, ts)
+        self._order = deque()  # entry ids, oldest first
+        self._next_id = 0
+        self._checks = 0
+        self._replays = 0
+
+    @staticmethod
+    def _chunks(h: int):
+        mask = (1 << CHUNK_BITS) - 1
+        return [(h >> (i * CHUNK_BITS)) & mask for i in range(NUM_CHUNKS)]
+
+    def check_and_add(self, image_hash: int, employee_id: str,
+                      timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Look up near-duplicates of `image_hash`, then store it.
+
+        Returns:
+            Matches (other employees, or the same employee outside the retake gap),
+            closest first
+        """
+        ts = float(timestamp) if timestamp is not None else time.time()
+        image_hash = int(image_hash)
+        employee_id = str(employee_id)
+
+        with self._lock:
+            self._evict(ts)
+            matches = self._search(image_hash, employee_id, ts)
+            self._insert(image_hash, employee_id, ts)
+            self._checks += 1
+            if matches:
+                self._replays += 1
+        return matches
+
+    def _search(self, image_hash: int, employee_id: str, ts: float) -> List[Dict[str, Any]]:
+        candidates = set()
+        for i, chunk in enumerate(self._chunks(image_hash)):
+            table = self._tables[i]
+            candidates.update(table.get(chunk, ()))
+            for bit in range(CHUNK_BITS):
+                candidates.update(table.get(chunk ^ (1 << bit), ()))
+
+        matches = []
+        for entry_id in candidates:
+            other_hash, other_employee, other_ts = self._entries[entry_id]
+            distance = hamming_distance(image_hash, other_hash)
+            if distance > self.max_distance:
+                continue
+            if other_employee == employee_id and abs(ts - other_ts) < self.SAME_EMPLOYEE_GAP_SECONDS:
+                continue
+            matches.append({
+                "employee_id": other_employee,
+                "hamming_distance": distance,
+                "seen_at": other_ts
+            })
+        matches.sort(key=lambda m: m["hamming_distance"])
+        return matches
+
+    def _insert(self, image_hash: int, employee_id: str, ts: float):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (image_hash, employee_id, ts)
+        self._order.append(entry_id)
+        for i, chunk in enumerate(self._chunks(image_hash)):
+            self._tables[i].setdefault(chunk, set()).add(entry_id)
+        while len(self._order) > self.max_entries:
+            self._remove(self._order.popleft())
+
+    def _evict(self, now: float):
+        """Drop entries older than the window (oldest first, so cost is amortized O(1))."""
+        cutoff = now - self.window_seconds
+        while self._order and self._entries[self._order[0]][2] < cutoff:
+            self._remove(self._order.popleft())
+
+    def _remove(self, entry_id: int):
+        image_hash = self._entries.pop(entry_id)[0]
+        for i, chunk in enumerate(self._chunks(image_hash)):
+            bucket = self._tables[i].get(chunk)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._tables[i][chunk]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hashes_stored": len(self._entries),
+                "checks": self._checks,
+                "replays_flagged": self._replays
+            }
+
+
+# Singleton instance
+replay_index = ReplayHashIndex()
@@ -0,0 +1,84 @@
+"""
+Sentinel Worker Pool for HAKIKI AI v2.0
+Runs CPU-bound liveness checks (PIL decode + NumPy FFT) off the asyncio event loop.
+Bounded: a fixed number of workers plus a short queue; excess work is rejected.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+class SentinelSaturatedError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class SentinelWorkerPool:
+    """
+    Size-limited executor with backpressure for Sentinel verification.
+    Threads are enough here: PIL decoding and NumPy FFTs release the GIL,
+    and image bytes don't have to be pickled across process boundaries.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sentinel")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run `fn(*args, **kwargs)` on a worker thread and await its result.
+        The job holds its slot until the thread finishes it, even if the
+        caller is cancelled first (a job already running can't be stopped).
+
+        Raises:
+            SentinelSaturatedError: if workers + queue are already full
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise SentinelSaturatedError(
+                    f"Sentinel saturated: {self._in_flight} jobs in flight "
+                    f"({self.max_workers} workers, queue {self.max_queue})"
+                )
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future: Optional[Future]):
+        """Free the slot once the job has finished (or was cancelled before it started)."""
+        with self._lock:
+            self._in_flight -= 1
+            if future is not None and not future.cancelled():
+                self._completed += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """Current load and lifetime counters."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.max_workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+
+# Singleton instance
+sentinel_pool = SentinelWorkerPool(
+    max_workers=settings.SENTINEL_WORKERS,
+    max_queue=settings.SENTINEL_MAX_QUEUE
+)
@@ -0,0 +1,254 @@
+"""
+Duty Station Registry for HAKIKI AI v2.0
+Maps employees to their Duty_Station and indexes stations spatially
+(KD-tree on unit-sphere coordinates) for geofence lookups.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+
+
+# Earth radius in km (matches SentinelFogNode.R)
+EARTH_RADIUS_KM = 6371.0
+
+# Default geofence radius (matches SentinelFogNode.GEOFENCE_RADIUS_KM)
+DEFAULT_RADIUS_KM = 0.5
+
+# Fallback station for employees without a registered Duty_Station
+DEFAULT_STATION = {
+    "station_id": "KICC, Nairobi",
+    "lat": -1.2884,
+    "lon": 36.8233,
+    "radius_km": DEFAULT_RADIUS_KM
+}
+
+# Approximate county HQ coordinates, used when the payroll carries a
+# Duty_Station name but no station coordinates.
+COUNTY_COORDINATES = {
+    "Nairobi": (-1.2864, 36.8172),
+    "Mombasa": (-4.0435, 39.6682),
+    "Kisumu": (-0.0917, 34.7680),
+    "Nakuru": (-0.3031, 36.0800),
+    "Uasin Gishu": (0.5143, 35.2698),
+    "Kiambu": (-1.1714, 36.8356),
+    "Machakos": (-1.5177, 37.2634),
+    "Nyeri": (-0.4201, 36.9476),
+    "Garissa": (-0.4532, 39.6461),
+    "Turkana": (3.1190, 35.5973),
+}
+
+
+def to_unit_sphere(lat, lon) -> np.ndarray:
+    """Convert degrees to (N, 3) unit vectors so Euclidean KD-tree distance is the chord."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def _chord_to_km(chord) -> np.ndarray:
+    """Chord length on the unit sphere -> great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    """Great-circle distance in km -> chord length on the unit sphere."""
+    return float(2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2))
+
+
+class StationRegistry:
+    """
+    Singleton registry of duty stations.
+    Employee -> station is a dict lookup; spatial queries go through a KD-tree,
+    so geofencing costs O(log n) whether there are 10 stations or 50k.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StationRegistry, cls).__new__(cls)
+            cls._instance._reset()
+        return cls._instance
+
+    def _reset(self):
+        self.station_ids: List[str] = []
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.radii = np.empty(0)
+        self._station_index: Dict[str, int] = {}
+        self._employee_station: Dict[str, int] = {}
+        self._tree: Optional[KDTree] = None
+
+    # ---------------- Loading ----------------
+
+    def load_stations(self, stations: pd.DataFrame) -> Dict[str, int]:
+        """
+        Load a station table (Station_ID/Duty_Station, Lat, Lon, optional Radius_km).
+        Replaces any previously loaded stations; employee assignments are kept
+        only for stations that still exist.
+        """
+        id_col = "Station_ID" if "Station_ID" in stations.columns else "Duty_Station"
+        lat_col = "Lat" if "Lat" in stations.columns else "Station_Lat"
+        lon_col = "Lon" if "Lon" in stations.columns else "Station_Long"
+
+        stations = stations.dropna(subset=[id_col, lat_col, lon_col]).drop_duplicates(subset=[id_col])
+        radii = stations["Radius_km"] if "Radius_km" in stations.columns else DEFAULT_RADIUS_KM
+
+        old_ids = self.station_ids
+        self._set_stations(
+            stations[id_col].astype(str).tolist(),
+            stations[lat_col].to_numpy(dtype=np.float64),
+            stations[lon_col].to_numpy(dtype=np.float64),
+            np.broadcast_to(np.asarray(radii, dtype=np.float64), len(stations)).copy()
+        )
+
+        # Re-point existing employee assignments at the new station indices
+        remapped = {}
+        for emp_id, old_idx in self._employee_station.items():
+            new_idx = self._station_index.get(old_ids[old_idx])
+            if new_idx is not None:
+                remapped[emp_id] = new_idx
+        self._employee_station = remapped
+
+        print(f"[STATIONS] Loaded {len(self.station_ids)} stations")
+        return {"stations": len(self.station_ids)}
+
+    def load_stations_csv(self, path: str) -> Dict[str, int]:
+        """Load a station table from CSV."""
+        return self.load_stations(pd.read_csv(path))
+
+    def load_from_payroll(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Build employee -> station assignments from the payroll `Duty_Station` column.
+        Stations already loaded (e.g. from a station CSV) keep their coordinates;
+        new ones use Station_Lat/Station_Long if present, else their county HQ.
+        """
+        if "Duty_Station" not in df.columns or "Employee_ID" not in df.columns:
+            print("[STATIONS] Payroll has no Duty_Station column; using default station")
+            return {"stations": len(self.station_ids), "employees": len(self._employee_station)}
+
+        rows = df.dropna(subset=["Duty_Station"])
+        unique_stations = rows.drop_duplicates(subset=["Duty_Station"])
+
+        new_ids, new_lats, new_lons = [], [], []
+        has_coords = "Station_Lat" in rows.columns and "Station_Long" in rows.columns
+        for _, row in unique_stations.iterrows():
+            station_id = str(row["Duty_Station"])
+            if station_id in self._station_index:
+                continue
+            coords = None
+            if has_coords and pd.notna(row["Station_Lat"]) and pd.notna(row["Station_Long"]):
+                coords = (float(row["Station_Lat"]), float(row["Station_Long"]))
+            else:
+                county = str(row.get("County", station_id.split(" - ")[0])).strip()
+                coords = COUNTY_COORDINATES.get(county)
+            if coords is None:
+                continue
+            new_ids.append(station_id)
+            new_lats.append(coords[0])
+            new_lons.append(coords[1])
+
+        if new_ids:
+            self._set_stations(
+                self.station_ids + new_ids,
+                np.concatenate([self.lats, new_lats]),
+                np.concatenate([self.lons, new_lons]),
+                np.concatenate([self.radii, np.full(len(new_ids), DEFAULT_RADIUS_KM)])
+            )
+
+        station_idx = rows["Duty_Station"].astype(str).map(self._station_index)
+        known = station_idx.notna()
+        self._employee_station = dict(zip(
+            rows.loc[known, "Employee_ID"].astype(str),
+            station_idx[known].astype(int)
+        ))
+
+        print(f"[STATIONS] {len(self._employee_station)} employees assigned to {len(self.station_ids)} stations")
+        return {"stations": len(self.station_ids), "employees": len(self._employee_station)}
+
+    def _set_stations(self, station_ids: List[str], lats, lons, radii):
+        """Replace the station arrays and rebuild the KD-tree."""
+        self.station_ids = list(station_ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.radii = np.asarray(radii, dtype=np.float64)
+        self._station_index = {sid: i for i, sid in enumerate(self.station_ids)}
+        self._tree = KDTree(to_unit_sphere(self.lats, self.lons)) if self.station_ids else None
+
+    # ---------------- Lookups ----------------
+
+    def _station_dict(self, idx: int) -> Dict[str, Any]:
+        return {
+            "station_id": self.station_ids[idx],
+            "lat": float(self.lats[idx]),
+            "lon": float(self.lons[idx]),
+            "radius_km": float(self.radii[idx])
+        }
+
+    def get_station(self, station_id: str) -> Optional[Dict[str, Any]]:
+        """Station by ID, or None."""
+        idx = self._station_index.get(station_id)
+        return self._station_dict(idx) if idx is not None else None
+
+    def get_station_for_employee(self, employee_id: str) -> Dict[str, Any]:
+        """O(1) employee -> duty station; falls back to DEFAULT_STATION."""
+        idx = self._employee_station.get(str(employee_id))
+        if idx is None:
+            return dict(DEFAULT_STATION)
+        return self._station_dict(idx)
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Dict[str, Any]]:
+        """The k stations closest to a point, nearest first, with distance_km."""
+        if self._tree is None:
+            return []
+        k = min(k, len(self.station_ids))
+        chord, idx = self._tree.query(to_unit_sphere([lat], [lon]), k=k)
+        return [
+            {**self._station_dict(i), "distance_km": round(float(d), 3)}
+            for i, d in zip(idx[0], _chord_to_km(chord[0]))
+        ]
+
+    def stations_containing(self, lat: float, lon: float) -> List[Dict[str, Any]]:
+        """Stations whose geofence (own radius) contains the point, nearest first."""
+        if self._tree is None:
+            return []
+        search_chord = _km_to_chord(float(self.radii.max()))
+        idx, chord = self._tree.query_radius(
+            to_unit_sphere([lat], [lon]), r=search_chord, return_distance=True, sort_results=True
+        )
+        distances = _chord_to_km(chord[0])
+        return [
+            {**self._station_dict(i), "distance_km": round(float(d), 3)}
+            for i, d in zip(idx[0], distances)
+            if d <= self.radii[i]
+        ]
+
+    def station_indices(self, station_ids) -> np.ndarray:
+        """Vectorized station ID -> row index (-1 where unknown)."""
+        codes, uniques = pd.factorize(pd.Series(station_ids, dtype=object).astype(str))
+        lookup = np.array([self._station_index.get(sid, -1) for sid in uniques], dtype=np.int64)
+        return lookup[codes] if len(lookup) else np.full(len(codes), -1, dtype=np.int64)
+
+    def employee_station_indices(self, employee_ids) -> np.ndarray:
+        """Vectorized employee ID -> assigned station index (-1 where unassigned)."""
+        codes, uniques = pd.factorize(pd.Series(employee_ids, dtype=object).astype(str))
+        lookup = np.array([self._employee_station.get(eid, -1) for eid in uniques], dtype=np.int64)
+        return lookup[codes] if len(lookup) else np.full(len(codes), -1, dtype=np.int64)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "stations": len(self.station_ids),
+            "employees_assigned": len(self._employee_station)
+        }
+
+
+# Singleton instance
+station_registry = StationRegistry()
+if settings.STATIONS_PATH:
+    try:
+        station_registry.load_stations_csv(settings.STATIONS_PATH)
+    except Exception as e:
+        print(f"[STATIONS] Could not load {settings.STATIONS_PATH}: {e}")
@@ -0,0 +1,245 @@
+"""
+Stop Order Archive for HAKIKI AI v2.0
+Content-addressed store for generated Stop Orders with a SQLite index
+(reference -> suspect -> file), written off the request path.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.core.config import settings
+from app.services.pdf_generator import StopOrderGenerator, reference_number
+
+
+SUSPECT_FIELDS = ("full_name", "national_id", "employee_id", "job_group", "department", "amount_at_risk", "fraud_reason")
+
+# StopOrder_<employee_id>_<YYYYmmdd>_<HHMMSS>.pdf written by create_pdf()
+LEGACY_NAME = re.compile(r"^StopOrder_(?P<employee_id>.+)_(?P<day>\d{8})_(?P<time>\d{6})\.pdf$")
+
+
+def input_digest(suspect: dict, timestamp: datetime) -> str:
+    """Identity of an order: the suspect fields plus the day it is issued."""
+    fields = {key: suspect.get(key) for key in SUSPECT_FIELDS}
+    fields["day"] = timestamp.strftime("%Y%m%d")
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class StopOrderArchive:
+    """
+    Stop Orders are rendered in memory and returned immediately; archiving
+    happens on a single background writer thread.
+    - Files are named by the SHA-256 of their bytes (stored once).
+    - The same suspect on the same day maps to the same order, so repeats are
+      served from the archive instead of being rendered and saved again.
+    The index and object store are created under DATA_DIR on first use.
+    """
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = base_dir or Path(settings.DATA_DIR) / "stop_orders"
+        self.objects_dir = self.base_dir / "objects"
+        self.index_path = self.base_dir / "index.sqlite3"
+        self.generator = StopOrderGenerator()
+
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stop-order-archive")
+        self._pending: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}  # input_digest -> not yet on disk
+        self._served_from_archive = 0
+
+    def _database(self) -> sqlite3.Connection:
+        """Index connection, opened (and the archive directory created) on first use."""
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    self._db = self._open_index()
+        return self._db
+
+    def _open_index(self) -> sqlite3.Connection:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        new_index = not self.index_path.exists()
+        db = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS stop_orders (
+                input_digest   TEXT PRIMARY KEY,
+                reference      TEXT NOT NULL,
+                employee_id    TEXT NOT NULL,
+                full_name      TEXT,
+                content_sha256 TEXT NOT NULL,
+                path           TEXT NOT NULL,
+                size_bytes     INTEGER NOT NULL,
+                created_at     TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_stop_orders_reference ON stop_orders(reference);
+            CREATE INDEX IF NOT EXISTS idx_stop_orders_employee ON stop_orders(employee_id);
+        """)
+        if new_index:
+            self._import_legacy(db)
+        return db
+
+    # ---------------- Write path ----------------
+
+    def get_or_render(self, suspect: dict, timestamp: Optional[datetime] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Stop Order bytes for a suspect: from the archive if this order was
+        already issued today, otherwise rendered in memory and archived in the background.
+
+        Returns:
+            (pdf_bytes, record)
+        """
+        timestamp = timestamp or datetime.now()
+        digest = input_digest(suspect, timestamp)
+
+        existing = self._load(digest)
+        if existing is not None:
+            with self._lock:
+                self._served_from_archive += 1
+            return existing
+
+        pdf_bytes = self.generator.render_pdf(suspect, timestamp)
+        record = self.store_async(suspect, pdf_bytes, timestamp, digest)
+        return pdf_bytes, record
+
+    def store_async(self, suspect: dict, pdf_bytes: bytes, timestamp: datetime,
+                    digest: Optional[str] = None) -> Dict[str, Any]:
+        """Queue an order for archiving and return its index record right away."""
+        digest = digest or input_digest(suspect, timestamp)
+        content_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        record = {
+            "input_digest": digest,
+            "reference": reference_number(suspect, timestamp),
+            "employee_id": str(suspect.get("employee_id", "UNKNOWN")),
+            "full_name": suspect.get("full_name"),
+            "content_sha256": content_sha256,
+            "path": str(Path("objects") / content_sha256[:2] / f"{content_sha256}.pdf"),
+            "size_bytes": len(pdf_bytes),
+            "created_at": timestamp.isoformat(timespec="seconds")
+        }
+        with self._lock:
+            if digest in self._pending:
+                return self._pending[digest][1]
+            self._pending[digest] = (pdf_bytes, record)
+        self._writer.submit(self._write, digest)
+        return record
+
+    def _write(self, digest: str):
+        """Background writer: store the file (once per content hash) and index the order."""
+        with self._lock:
+            pdf_bytes, record = self._pending[digest]
+            indexed = self._database().execute("SELECT 1 FROM stop_orders WHERE input_digest = ?", (digest,)).fetchone()
+        try:
+            if indexed:
+                return
+            path = self.base_dir / record["path"]
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(pdf_bytes)
+                tmp.replace(path)
+            with self._lock:
+                self._database().execute(
+                    "INSERT OR IGNORE INTO stop_orders VALUES "
+                    "(:input_digest, :reference, :employee_id, :full_name, :content_sha256, :path, :size_bytes, :created_at)",
+                    record
+                )
+                self._database().commit()
+        except Exception as e:
+            print(f"[ERROR] Stop Order archive failed for {record['reference']}: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued order is on disk."""
+        self._writer.submit(lambda: None).result(timeout=timeout)
+
+    def _import_legacy(self, db: sqlite3.Connection):
+        """Index files written by create_pdf() before the archive existed (one per employee per day)."""
+        imported = 0
+        for path in sorted(self.base_dir.glob("StopOrder_*.pdf"), reverse=True):
+            match = LEGACY_NAME.match(path.name)
+            if not match:
+                continue
+            day = datetime.strptime(match["day"] + match["time"], "%Y%m%d%H%M%S")
+            suspect = {"employee_id": match["employee_id"]}
+            content_sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO stop_orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    hashlib.sha256(f"legacy:{match['employee_id']}:{match['day']}".encode()).hexdigest(),
+                    reference_number(suspect, day), match["employee_id"], None,
+                    content_sha256, path.name, path.stat().st_size, day.isoformat()
+                )
+            )
+            imported += cursor.rowcount
+        db.commit()
+        if imported:
+            print(f"[STOP-ORDER] Indexed {imported} existing Stop Orders")
+
+    # ---------------- Read path ----------------
+
+    def _load(self, digest: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        with self._lock:
+            pending = self._pending.get(digest)
+            if pending is not None:
+                return pending
+            row = self._database().execute("SELECT * FROM stop_orders WHERE input_digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        path = self.base_dir / row["path"]
+        if not path.exists():
+            return None
+        return path.read_bytes(), dict(row)
+
+    def lookup(self, reference: Optional[str] = None, employee_id: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """Archived orders by reference and/or employee, newest first (indexed, no directory scan)."""
+        clauses, params = [], []
+        if reference:
+            clauses.append("reference = ?")
+            params.append(reference)
+        if employee_id:
+            clauses.append("employee_id = ?")
+            params.append(employee_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._database().execute(
+                f"SELECT * FROM stop_orders {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+            pending = [r for _, r in self._pending.values()
+                       if (not reference or r["reference"] == reference)
+                       and (not employee_id or r["employee_id"] == employee_id)]
+        records = [dict(row) for row in rows]
+        seen = {r["input_digest"] for r in records}
+        records.extend(r for r in pending if r["input_digest"] not in seen)
+        records.sort(key=lambda r: r["created_at"], reverse=True)
+        return records[:limit]
+
+    def read(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """PDF bytes for an index record (None if the file is gone)."""
+        loaded = self._load(record["input_digest"])
+        return loaded[0] if loaded is not None else None
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            orders, files, size = self._database().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT content_sha256), COALESCE(SUM(size_bytes), 0) FROM stop_orders"
+            ).fetchone()
+            return {
+                "orders_indexed": orders,
+                "files_stored": files,
+                "bytes_indexed": size,
+                "pending_writes": len(self._pending),
+                "served_from_archive": self._served_from_archive
+            }
+
+
+# Singleton instance
+stop_order_archive = StopOrderArchive()
@@ -0,0 +1,178 @@
+"""
+Bulk Stop Order Pipeline for HAKIKI AI v2.0
+Renders Stop Payment Orders for many suspects in a process pool and streams
+them back as a ZIP while chunks finish, with per-job progress tracking.
+Every rendered order is also handed to the Stop Order archive.
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+
+from app.core.config import settings
+from app.services.pdf_generator import render_stop_orders
+from app.services.stop_order_archive import stop_order_archive
+
+
+class _ZipChunkBuffer:
+    """Write-only sink for zipfile; the response drains it after every entry."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class StopOrderBatchService:
+    """
+    Parallel Stop Order rendering.
+    Suspects are split into chunks (one pickle round-trip per chunk, not per PDF)
+    and rendered on a lazily started process pool, so fpdf layout work scales
+    across cores instead of serializing on the GIL.
+    """
+
+    CHUNK_SIZE = 25  # Suspects per worker task
+    MAX_JOBS = 200  # Finished jobs kept for progress queries
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the API process runs threads, which fork does not copy safely
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool (a worker died) so the next job starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- Jobs ----------------
+
+    def create_job(self, total: int) -> str:
+        """Register a bulk job and return its ID."""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "QUEUED",
+                "total": total,
+                "completed": 0,
+                "failed": 0,
+                "started_at": time.time(),
+                "finished_at": None
+            }
+            while len(self._jobs) > self.MAX_JOBS:
+                self._jobs.popitem(last=False)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress snapshot for a job, or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+        job["elapsed_s"] = round(elapsed, 3)
+        job["progress"] = round(job["completed"] / job["total"], 4) if job["total"] else 1.0
+        job["orders_per_sec"] = round(job["completed"] / elapsed, 1) if elapsed > 0 else 0.0
+        return job
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                for key, value in fields.items():
+                    job[key] = job[key] + value if key in ("completed", "failed") else value
+
+    # ---------------- Rendering ----------------
+
+    def stream_zip(self, job_id: str, suspects: List[dict]) -> Iterator[bytes]:
+        """
+        Render all suspects and yield ZIP bytes as each chunk of PDFs completes.
+        Entries arrive in completion order; if the client disconnects, pending
+        chunks are cancelled.
+        """
+        timestamp = datetime.now()
+        chunks = [suspects[i:i + self.CHUNK_SIZE] for i in range(0, len(suspects), self.CHUNK_SIZE)]
+        executor = self._get_executor()
+        futures = {executor.submit(render_stop_orders, chunk, timestamp): chunk for chunk in chunks}
+        self._update(job_id, status="RUNNING")
+
+        buffer = _ZipChunkBuffer()
+        names = set()
+        errors = []
+        try:
+            with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+                for future in as_completed(futures):
+                    try:
+                        rendered = future.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._discard_executor(executor)
+                        chunk = futures[future]
+                        errors.extend(f"{s.get('employee_id', 'UNKNOWN')}: {e}" for s in chunk)
+                        self._update(job_id, failed=len(chunk))
+                        continue
+
+                    for suspect, (employee_id, pdf_bytes) in zip(futures[future], rendered):
+                        archive.writestr(self._unique_name(employee_id, names), pdf_bytes)
+                        stop_order_archive.store_async(suspect, pdf_bytes, timestamp)
+                    self._update(job_id, completed=len(rendered))
+                    yield buffer.drain()
+
+                if errors:
+                    archive.writestr("ERRORS.txt", "\n".join(errors))
+            yield buffer.drain()
+        except GeneratorExit:
+            for future in futures:
+                future.cancel()
+            self._update(job_id, status="CANCELLED", finished_at=time.time())
+            print(f"[STOP-ORDER] Job {job_id} cancelled by client")
+            raise
+
+        self._update(job_id, status="COMPLETED", finished_at=time.time())
+        job = self.get_job(job_id)
+        print(f"[STOP-ORDER] Job {job_id}: {job['completed']}/{job['total']} orders "
+              f"in {job['elapsed_s']}s ({job['orders_per_sec']}/s)")
+
+    @staticmethod
+    def _unique_name(employee_id: str, names: set) -> str:
+        name = f"StopOrder_{employee_id}.pdf"
+        n = 1
+        while name in names:
+            n += 1
+            name = f"StopOrder_{employee_id}_{n}.pdf"
+        names.add(name)
+        return name
+
+
+# Singleton instance
+stop_order_batch = StopOrderBatchService(max_workers=settings.STOP_ORDER_WORKERS)
@@ -0,0 +1,334 @@
+"""
+Payroll Name Index for HAKIKI AI v2.0
+Resolves names from tips to ranked payroll employees. Built once per dataset:
+name tokens are indexed by character trigrams and by a phonetic key tuned for
+Kenyan spelling variants (Odhiambo/Odiambo, Otieno/Otyeno, Kiplagat/Kiblagat),
+so a lookup touches a few postings instead of scanning every Full_Name.
+
+Imported both as app.utils.name_index (API) and backend.app.utils.name_index
+(intelligence.py at the project root).
+"""
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Titles dropped from names before matching
+HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "prof", "hon", "eng", "rev", "sir", "madam"}
+
+# Spelling variants folded by the phonetic key, applied in order
+PHONETIC_RULES = [
+    ("dh", "d"),   # Odhiambo / Odiambo
+    ("th", "t"),   # Mathenge / Matenge
+    ("ph", "f"),
+    ("sh", "s"),
+    ("ch", "C"),   # Keep "ch" apart from hard "c"
+    ("ck", "k"),
+    ("c", "k"),
+    ("q", "k"),
+    ("h", ""),     # John / Jon, Mutuah / Mutua
+    ("C", "c"),
+    ("y", "i"),    # Otyeno / Otieno
+    ("b", "p"),    # Kiblagat / Kiplagat
+    ("l", "r"),    # Kikuyu and Luo l/r interchange
+]
+
+ID_COLUMNS = ("Employee_ID", "National_ID")
+
+# Tokens per payroll name used for scoring (longer names keep their first ones)
+MAX_NAME_TOKENS = 6
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_LETTERS = re.compile(r"[^a-z]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def _fold(text: str) -> str:
+    """Lowercase ASCII without apostrophes, as name tokens are built from."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return _APOSTROPHES.sub("", text.lower())
+
+
+def name_tokens(name: str) -> List[str]:
+    """Lowercase ASCII name tokens without titles ("Dr. Ochieng'" -> ["ochieng"])."""
+    return [t for t in _NON_LETTERS.split(_fold(name)) if len(t) > 1 and t not in HONORIFICS]
+
+
+def phonetic_key(token: str) -> str:
+    """Spelling-variant key for one name token."""
+    key = token
+    for old, new in PHONETIC_RULES:
+        key = key.replace(old, new)
+    return _REPEATS.sub(r"\1", key)
+
+
+def _trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _file_stamp(path: Optional[str]):
+    """(path, mtime, size) identifying one version of a dataset file."""
+    if not path or not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime, stat.st_size
+
+
+def _distinct(postings: List[np.ndarray]) -> np.ndarray:
+    """Sorted union of row postings."""
+    if not postings:
+        return np.empty(0, dtype=np.int32)
+    if len(postings) == 1:
+        return postings[0]  # Postings are already sorted and distinct
+    rows = np.sort(np.concatenate(postings))
+    return rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+
+
+class PayrollNameIndex:
+    """
+    Name -> employee index over one payroll table.
+
+    Each distinct name token is indexed by trigram and phonetic key, and maps
+    to the rows that contain it. resolve() scores every row sharing a similar
+    token and returns the best few, so cost depends on how common the names
+    are, not on payroll size.
+    """
+
+    MIN_TOKEN_SIMILARITY = 0.6  # Trigram Dice coefficient
+    PHONETIC_SIMILARITY = 0.9
+    MIN_SCORE = 0.6  # Above 1/2, so one shared first name is not a match
+    DEFAULT_LIMIT = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.source: Optional[str] = None
+        self._source_stamp = None
+        self._employee_ids: List[str] = []
+        self._names: List[str] = []
+        self._row_token_counts = np.empty(0, dtype=np.int32)
+        self._token_ids: Dict[str, int] = {}
+        self._tokens: List[str] = []  # Token id -> token
+        self._token_rows: List[np.ndarray] = []
+        self._token_gram_counts = np.empty(0, dtype=np.int32)
+        self._gram_tokens: Dict[str, np.ndarray] = {}
+        self._phonetic_tokens: Dict[str, List[int]] = {}
+        # Column j = each row's j-th token id, padded with len(vocabulary)
+        # (an always-zero similarity slot)
+        self._row_token_columns: List[np.ndarray] = []
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._names)
+
+    # ---------------- Building ----------------
+
+    def load(self, df: pd.DataFrame, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        (Re)build the index from a payroll DataFrame with Full_Name and an ID
+        column (Employee_ID, else National_ID, else the row number).
+        `source` is the file the DataFrame came from, if any.
+        """
+        if "Full_Name" not in df.columns:
+            raise ValueError(f"Payroll has no Full_Name column. Found: {df.columns.tolist()}")
+        id_col = next((c for c in ID_COLUMNS if c in df.columns), None)
+        names = df["Full_Name"].fillna("").astype(str).tolist()
+        employee_ids = df[id_col].astype(str).tolist() if id_col else [str(i) for i in range(len(df))]
+
+        token_ids: Dict[str, int] = {}
+        token_rows: List[List[int]] = []
+        row_token_lists: List[List[int]] = []
+        for row, name in enumerate(names):
+            row_ids = []
+            for token in dict.fromkeys(name_tokens(name)):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(token_rows)
+                    token_rows.append([])
+                token_rows[token_id].append(row)
+                row_ids.append(token_id)
+            row_token_lists.append(row_ids)
+
+        row_token_counts = np.fromiter(map(len, row_token_lists), dtype=np.int32, count=len(names))
+        row_token_columns = []
+        for j in range(min(int(row_token_counts.max(initial=0)), MAX_NAME_TOKENS)):
+            column = np.full(len(names), len(token_ids), dtype=np.int32)
+            rows = np.flatnonzero(row_token_counts > j)
+            column[rows] = [row_token_lists[row][j] for row in rows.tolist()]
+            row_token_columns.append(column)
+
+        gram_tokens: Dict[str, List[int]] = {}
+        phonetic_tokens: Dict[str, List[int]] = {}
+        gram_counts = np.zeros(len(token_ids), dtype=np.int32)
+        for token, token_id in token_ids.items():
+            grams = _trigrams(token)
+            gram_counts[token_id] = len(grams)
+            for gram in grams:
+                gram_tokens.setdefault(gram, []).append(token_id)
+            phonetic_tokens.setdefault(phonetic_key(token), []).append(token_id)
+
+        with self._lock:
+            self._reset()
+            self.source = source
+            self._source_stamp = _file_stamp(source)
+            self._employee_ids = employee_ids
+            self._names = names
+            self._row_token_counts = row_token_counts
+            self._token_ids = token_ids
+            self._tokens = list(token_ids)
+            self._token_rows = [np.asarray(rows, dtype=np.int32) for rows in token_rows]
+            self._token_gram_counts = gram_counts
+            self._gram_tokens = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in gram_tokens.items()}
+            self._phonetic_tokens = phonetic_tokens
+            self._row_token_columns = row_token_columns
+
+        print(f"[NAMES] Indexed {len(names):,} payroll names ({len(token_ids):,} distinct tokens)")
+        return self.get_stats()
+
+    def load_csv(self, path: str) -> Dict[str, Any]:
+        """Build from a payroll CSV, skipping the rebuild if the file is unchanged."""
+        if self.loaded and _file_stamp(path) == self._source_stamp:
+            return self.get_stats()
+        return self.load(pd.read_csv(path, usecols=lambda c: c == "Full_Name" or c in ID_COLUMNS), source=path)
+
+    # ---------------- Lookup ----------------
+
+    def _similar_tokens(self, token: str) -> Dict[int, float]:
+        """Indexed token id -> similarity to `token` (1.0 = same token)."""
+        similar: Dict[int, float] = {}
+        grams = _trigrams(token)
+        postings = [self._gram_tokens[g] for g in grams if g in self._gram_tokens]
+        if postings:
+            shared = np.bincount(np.concatenate(postings), minlength=len(self._token_gram_counts))
+            candidates = np.flatnonzero(shared)
+            dice = 2.0 * shared[candidates] / (len(grams) + self._token_gram_counts[candidates])
+            keep = dice >= self.MIN_TOKEN_SIMILARITY
+            similar = dict(zip(candidates[keep].tolist(), dice[keep].tolist()))
+        for token_id in self._phonetic_tokens.get(phonetic_key(token), ()):
+            similar[token_id] = max(similar.get(token_id, 0.0), self.PHONETIC_SIMILARITY)
+        exact = self._token_ids.get(token)
+        for token_id, score in similar.items():
+            if token_id != exact:
+                similar[token_id] = min(score, self.PHONETIC_SIMILARITY)
+        return similar
+
+    def resolve(self, name: str, limit: int = DEFAULT_LIMIT,
+                min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """
+        Ranked payroll candidates for a name from a tip.
+
+        A row's score is the mean best similarity of the query tokens, lightly
+        discounted when the payroll name has extra tokens, so "Kamau" ranks
+        "John Kamau" just below an exact "Kamau".
+
+        Only rows sharing the rarest query token are scored, unless rows
+        without it could still make the top `limit`.
+
+        Returns:
+            [{employee_id, full_name, score, row}], best first
+        """
+        tokens = list(dict.fromkeys(name_tokens(name)))
+        if not tokens or not self.loaded:
+            return []
+
+        with self._lock:
+            vocabulary = len(self._token_ids)
+            similarities, postings = [], []
+            for token in tokens:
+                similar = self._similar_tokens(token)
+                sim = np.zeros(vocabulary + 1, dtype=np.float64)
+                sim[list(similar)] = list(similar.values())
+                similarities.append(sim)
+                postings.append([self._token_rows[token_id] for token_id in similar])
+
+            def score(rows: np.ndarray) -> np.ndarray:
+                counts = self._row_token_counts[rows]
+                width = min(int(counts.max(initial=0)), len(self._row_token_columns))
+                row_tokens = [column[rows] for column in self._row_token_columns[:width]]
+                total = np.zeros(len(rows), dtype=np.float64)
+                for sim in similarities:
+                    best = np.zeros(len(rows), dtype=np.float64)
+                    for column in row_tokens:
+                        np.maximum(best, sim[column], out=best)
+                    total += best
+                coverage = len(tokens) / np.maximum(len(tokens), counts)
+                return total / len(tokens) * (0.9 + 0.1 * coverage)
+
+            sizes = [sum(len(rows) for rows in token_postings) for token_postings in postings]
+            anchor = int(np.argmin(sizes))
+            rows = _distinct(postings[anchor])
+            scores = score(rows)
+            # Rows missing the anchor token score at most (n - 1) / n
+            ceiling = (len(tokens) - 1) / len(tokens)
+            if ceiling >= min_score and np.count_nonzero(scores > ceiling) < limit:
+                rows = _distinct([rows for token_postings in postings for rows in token_postings])
+                scores = score(rows)
+
+            keep = scores >= min_score
+            rows, scores = rows[keep], scores[keep]
+            if len(rows) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                rows, scores = rows[top], scores[top]
+            order = np.lexsort((rows, -scores))
+
+            return [
+                {
+                    "employee_id": self._employee_ids[row],
+                    "full_name": self._names[row],
+                    "score": round(float(score), 4),
+                    "row": int(row)
+                }
+                for row, score in zip(rows[order].tolist(), scores[order].tolist())
+            ]
+
+    def containing(self, text: str) -> List[int]:
+        """
+        Rows whose Full_Name contains `text`, ignoring case (a literal
+        str.contains(text, case=False)), in payroll order.
+
+        Candidates come from the indexed tokens containing the query's longest
+        letter run; each is then checked against the full name. Queries
+        without such a run (or one that may sit inside a dropped title) scan
+        every name.
+        """
+        needle = str(text).casefold()
+        runs = [run for run in _NON_LETTERS.split(_fold(text)) if len(run) > 1]
+        longest = max(runs, key=len, default="")
+
+        with self._lock:
+            names = self._names
+            if not longest or any(longest in title for title in HONORIFICS):
+                # Missing names are indexed as "" and match nothing, as with na=False
+                return [row for row, name in enumerate(names) if name and needle in name.casefold()]
+
+            grams = [longest[i:i + 3] for i in range(len(longest) - 2)]
+            if grams:
+                postings = [self._gram_tokens.get(gram) for gram in grams]
+                if any(p is None for p in postings):
+                    return []
+                candidates = min(postings, key=len).tolist()
+            else:
+                candidates = range(len(self._tokens))
+            token_ids = [t for t in candidates if longest in self._tokens[t]]
+            rows = _distinct([self._token_rows[t] for t in token_ids]).tolist()
+            return [row for row in rows if needle in names[row].casefold()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "names_indexed": len(self._names),
+            "distinct_tokens": len(self._token_ids),
+            "trigrams": len(self._gram_tokens)
+        }
+
+
+# Singleton instance
+payroll_name_index = PayrollNameIndex()
@@ -0,0 +1,156 @@
+"""
+Payroll Analytics Index for HAKIKI AI v2.0
+Precomputed structures behind HakikiBrain's analytics questions, built once
+per payroll DataFrame: categorical codes and group -> row position maps
+(Ministry, Job_Group, Department), cached aggregates, and a salary-sorted
+index for range queries. Lookups cost O(result) instead of a mask over
+every row.
+
+Imported as backend.app.utils.payroll_analytics (brain.py at the project root).
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+GROUP_COLUMNS = ("Ministry", "Job_Group", "Department")
+SALARY_COLUMN = "Basic_Salary"
+
+
+class GroupIndex:
+    """Category -> row positions (ascending) for one column."""
+
+    def __init__(self, values: pd.Series):
+        codes, categories = pd.factorize(values, sort=False)  # Categories in order of appearance
+        self.codes = codes  # Per row; -1 = missing
+        self.categories: List[Any] = categories.tolist()
+        self._codes = {value: code for code, value in enumerate(self.categories)}
+        self._folded = {str(value).casefold(): code for code, value in enumerate(self.categories)}
+        valid = codes >= 0
+        rows = np.flatnonzero(valid)
+        order = np.argsort(codes[valid], kind="stable")  # Stable: rows stay ascending per group
+        self._rows = rows[order].astype(np.int64)
+        self.counts = np.bincount(codes[valid], minlength=len(self.categories))
+        self._starts = np.concatenate(([0], np.cumsum(self.counts)))
+
+    def code(self, value: Any, casefold: bool = False) -> Optional[int]:
+        if casefold:
+            return self._folded.get(str(value).casefold())
+        return self._codes.get(value)
+
+    def rows(self, code: int) -> np.ndarray:
+        return self._rows[self._starts[code]:self._starts[code + 1]]
+
+    def count(self, code: int) -> int:
+        return int(self.counts[code])
+
+
+class PayrollAnalytics:
+    """
+    Read-only analytics over one payroll table.
+
+    Row positions returned here are iloc positions into `df`.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.groups: Dict[str, GroupIndex] = {
+            column: GroupIndex(df[column]) for column in GROUP_COLUMNS if column in df.columns
+        }
+        self._values: Dict[str, np.ndarray] = {}
+        self._salary_order: Dict[bool, np.ndarray] = {}  # descending -> row order
+
+        # Salary range index (rows with a missing salary are left out, as in df[salary > x])
+        self._sorted_salaries = np.empty(0, dtype=np.float64)
+        self._salary_rows = np.empty(0, dtype=np.int64)
+        if SALARY_COLUMN in df.columns:
+            salaries = pd.to_numeric(df[SALARY_COLUMN], errors="coerce").to_numpy(dtype=np.float64)
+            rows = np.flatnonzero(~np.isnan(salaries))
+            order = np.argsort(salaries[rows], kind="stable")
+            self._salary_rows = rows[order]
+            self._sorted_salaries = salaries[self._salary_rows]
+
+        # Cached aggregates for the summary
+        self.aggregates = {
+            "records": len(df),
+            "total_gross_pay": float(df["Gross_Pay"].sum()) if "Gross_Pay" in df.columns else None,
+            "average_salary": float(self._sorted_salaries.mean()) if len(self._sorted_salaries) else None
+        }
+        print(f"[ANALYTICS] Indexed {len(df):,} payroll rows "
+              f"({', '.join(f'{c}: {len(g.categories)}' for c, g in self.groups.items())})")
+
+    # ---------------- Groups ----------------
+
+    def group(self, column: str) -> Optional[GroupIndex]:
+        return self.groups.get(column)
+
+    def categories(self, column: str) -> List[Any]:
+        index = self.groups.get(column)
+        return index.categories if index else []
+
+    # ---------------- Salary ranges ----------------
+
+    def salary_above(self, threshold: float, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Positions of rows with salary > threshold, in row order; with `limit`,
+        the first `limit` of them (cost grows with the matches, not the table).
+        """
+        start = int(np.searchsorted(self._sorted_salaries, threshold, side="right"))
+        rows = self._salary_rows[start:]
+        if limit is not None and len(rows) > limit:
+            rows = np.partition(rows, limit - 1)[:limit]
+        return np.sort(rows)
+
+    def count_salary_above(self, threshold: float) -> int:
+        return len(self._sorted_salaries) - int(np.searchsorted(self._sorted_salaries, threshold, side="right"))
+
+    def _salary_bounds(self, low: Optional[float], high: Optional[float],
+                       low_inclusive: bool, high_inclusive: bool) -> tuple:
+        salaries = self._sorted_salaries
+        start = 0 if low is None else int(np.searchsorted(salaries, low, side="left" if low_inclusive else "right"))
+        end = len(salaries) if high is None else int(
+            np.searchsorted(salaries, high, side="right" if high_inclusive else "left"))
+        return start, max(end, start)
+
+    def count_salary_range(self, low: Optional[float] = None, high: Optional[float] = None,
+                           low_inclusive: bool = True, high_inclusive: bool = True) -> int:
+        start, end = self._salary_bounds(low, high, low_inclusive, high_inclusive)
+        return end - start
+
+    def salary_range(self, low: Optional[float] = None, high: Optional[float] = None,
+                     low_inclusive: bool = True, high_inclusive: bool = True) -> np.ndarray:
+        """Positions of rows with salary between low and high (None = open), in row order."""
+        start, end = self._salary_bounds(low, high, low_inclusive, high_inclusive)
+        return np.sort(self._salary_rows[start:end])
+
+    def salary_order(self, descending: bool = False) -> np.ndarray:
+        """
+        Row positions by salary, ties in row order and missing salaries last
+        (as sort_values(kind="stable")).
+        """
+        order = self._salary_order.get(descending)
+        if order is None:
+            known = self._salary_rows
+            if descending:
+                known = known[np.argsort(-self._sorted_salaries, kind="stable")]
+            missing = np.setdiff1d(np.arange(len(self.df)), self._salary_rows, assume_unique=True)
+            order = self._salary_order[descending] = np.concatenate((known, missing))
+        return order
+
+    # ---------------- Rows ----------------
+
+    def values(self, column: str) -> np.ndarray:
+        """Column as a NumPy array (numeric where the column is numeric), cached."""
+        values = self._values.get(column)
+        if values is None:
+            if column not in self.df.columns:
+                raise KeyError(column)
+            series = self.df[column]
+            values = series.to_numpy(dtype=np.float64) if pd.api.types.is_numeric_dtype(series) \
+                else series.to_numpy(dtype=object)
+            self._values[column] = values
+        return values
+
+    def take(self, rows: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        frame = self.df.iloc[rows]
+        return frame[columns] if columns else frame
@@ -0,0 +1,360 @@
+"""
+Payroll Query DSL for HAKIKI AI v2.0
+A small structured query language for the agent API, compiled to vectorized
+NumPy filters over a PayrollAnalytics index:
+
+    {
+        "filters": [{"field": "Ministry", "op": "eq", "value": "Ministry of Health"},
+                    {"field": "Basic_Salary", "op": "gt", "value": 100000}],
+        "group_by": "Job_Group",                       # optional
+        "aggregates": [{"op": "count"}, {"op": "mean", "field": "Basic_Salary"}],
+        "sort": {"field": "Basic_Salary", "desc": true},
+        "fields": ["Full_Name", "Ministry", "Basic_Salary"],
+        "limit": 50
+    }
+
+The most selective indexed filter (category equality or a salary range)
+picks the candidate rows; the other filters are masks over those rows only.
+Results are paged with opaque cursors, and only the page is serialized.
+
+Imported both as app.utils.payroll_query and backend.app.utils.payroll_query.
+"""
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .lru_cache import LRUCache
+from .payroll_analytics import PayrollAnalytics, SALARY_COLUMN
+
+OPERATORS = {"eq", "ne", "in", "not_in", "gt", "gte", "lt", "lte", "between", "contains"}
+AGGREGATES = {"count", "sum", "mean", "min", "max"}
+RANGE_OPERATORS = {"gt", "gte", "lt", "lte", "between"}
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+STREAM_BATCH = 1000
+
+# Matching rows per (index, query) so later pages skip the filtering
+_result_cache = LRUCache(max_entries=64, ttl_seconds=300)
+
+
+class QueryError(ValueError):
+    """Invalid query spec or cursor (HTTP callers answer 400)."""
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class PayrollQuery:
+    """One validated query against a PayrollAnalytics index."""
+
+    def __init__(self, analytics: PayrollAnalytics, spec: Dict[str, Any]):
+        self.analytics = analytics
+        self.columns = list(analytics.df.columns)
+        self.filters = [self._filter(f) for f in spec.get("filters") or []]
+        self.group_by = spec.get("group_by")
+        self.aggregates = [self._aggregate(a) for a in spec.get("aggregates") or []]
+        self.sort = spec.get("sort") or None
+        self.fields = spec.get("fields") or None
+        self.limit = spec.get("limit", DEFAULT_LIMIT)
+        if self.limit is None:
+            self.limit = DEFAULT_LIMIT
+
+        if self.group_by is not None:
+            self._check_field(self.group_by)
+            if not self.aggregates:
+                self.aggregates = [{"op": "count", "field": None}]
+        if self.sort is not None:
+            if not isinstance(self.sort, dict):
+                raise QueryError("sort must be an object like {\"field\": ..., \"desc\": true}")
+            self.sort = {"field": self.sort.get("field"), "desc": bool(self.sort.get("desc", False))}
+            sortable = self.output_fields() if self.aggregates else self.columns
+            if self.sort["field"] not in sortable:
+                raise QueryError(f"Cannot sort by '{self.sort['field']}'. Sortable: {sortable}")
+        if self.fields is not None:
+            for field in self.fields:
+                self._check_field(field)
+        if isinstance(self.limit, bool) or not isinstance(self.limit, int):
+            raise QueryError(f"limit must be an integer, got {self.limit!r}")
+        if not 1 <= self.limit <= MAX_LIMIT:
+            raise QueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+        self.digest = hashlib.sha256(json.dumps(
+            [self.filters, self.group_by, self.aggregates, self.sort, len(analytics.df)],
+            sort_keys=True, default=str
+        ).encode()).hexdigest()[:16]
+
+    # ---------------- Validation ----------------
+
+    def _check_field(self, field: Any):
+        if field not in self.columns:
+            raise QueryError(f"Unknown field '{field}'. Available: {self.columns}")
+
+    def _filter(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        field, op, value = spec.get("field"), spec.get("op", "eq"), spec.get("value")
+        self._check_field(field)
+        if op not in OPERATORS:
+            raise QueryError(f"Unknown operator '{op}'. Use one of {sorted(OPERATORS)}")
+        if op in ("in", "not_in", "between") and not isinstance(value, (list, tuple)):
+            raise QueryError(f"'{op}' needs a list value")
+        if op == "between" and len(value) != 2:
+            raise QueryError("'between' needs [low, high]")
+        values = list(value) if op in ("in", "not_in", "between") else [value]
+        if not all(isinstance(v, SCALAR_TYPES) for v in values):
+            raise QueryError(f"'{op}' values must be strings, numbers or null")
+        if op in RANGE_OPERATORS:
+            if not pd.api.types.is_numeric_dtype(self.analytics.df[field]):
+                raise QueryError(f"'{op}' needs a numeric field; '{field}' is not")
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                raise QueryError(f"'{op}' on '{field}' needs numeric values, got {value!r}")
+        return {"field": field, "op": op, "value": list(value) if isinstance(value, tuple) else value}
+
+    def _aggregate(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        op, field = spec.get("op"), spec.get("field")
+        if op not in AGGREGATES:
+            raise QueryError(f"Unknown aggregate '{op}'. Use one of {sorted(AGGREGATES)}")
+        if op != "count":
+            self._check_field(field)
+            if not pd.api.types.is_numeric_dtype(self.analytics.df[field]):
+                raise QueryError(f"'{op}' needs a numeric field; '{field}' is not")
+        return {"op": op, "field": field if op != "count" else None}
+
+    @staticmethod
+    def _aggregate_name(aggregate: Dict[str, Any]) -> str:
+        return "count" if aggregate["op"] == "count" else f"{aggregate['op']}_{aggregate['field']}"
+
+    def output_fields(self) -> List[str]:
+        if self.aggregates:
+            keys = [self.group_by] if self.group_by is not None else []
+            return keys + [self._aggregate_name(a) for a in self.aggregates]
+        return self.fields or self.columns
+
+    # ---------------- Filtering ----------------
+
+    def _range(self, f: Dict[str, Any]) -> Dict[str, Any]:
+        """Salary-index bounds for a range filter."""
+        op, value = f["op"], f["value"]
+        if op == "between":
+            return {"low": float(value[0]), "high": float(value[1])}
+        if op in ("gt", "gte"):
+            return {"low": float(value), "low_inclusive": op == "gte"}
+        return {"high": float(value), "high_inclusive": op == "lte"}
+
+    def _category_codes(self, field: str, values: List[Any]) -> List[int]:
+        index = self.analytics.group(field)
+        codes = (index.code(v, casefold=isinstance(v, str)) for v in values)
+        return sorted({c for c in codes if c is not None})
+
+    def _driver(self):
+        """(estimated rows, filter, row getter) for the most selective indexed filter, or None."""
+        best = None
+        for f in self.filters:
+            if self.analytics.group(f["field"]) is not None and f["op"] in ("eq", "in"):
+                values = f["value"] if f["op"] == "in" else [f["value"]]
+                codes = self._category_codes(f["field"], values)
+                index = self.analytics.group(f["field"])
+                size = sum(index.count(c) for c in codes)
+
+                def rows(index=index, codes=codes):
+                    if not codes:
+                        return np.empty(0, dtype=np.int64)
+                    if len(codes) == 1:
+                        return index.rows(codes[0])
+                    return np.sort(np.concatenate([index.rows(c) for c in codes]))
+            elif f["field"] == SALARY_COLUMN and f["op"] in RANGE_OPERATORS:
+                bounds = self._range(f)
+                size = self.analytics.count_salary_range(**bounds)
+
+                def rows(bounds=bounds):
+                    return self.analytics.salary_range(**bounds)
+            else:
+                continue
+            if best is None or size < best[0]:
+                best = (size, f, rows)
+        return best
+
+    def _mask(self, f: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+        field, op, value = f["field"], f["op"], f["value"]
+        index = self.analytics.group(field)
+        if index is not None and op in ("eq", "ne", "in", "not_in"):
+            values = value if op in ("in", "not_in") else [value]
+            mask = np.isin(index.codes[rows], self._category_codes(field, values))
+            return ~mask if op in ("ne", "not_in") else mask
+
+        column = self.analytics.values(field)[rows]
+        if op == "contains":
+            return pd.Series(column).astype(str).str.contains(str(value), case=False, regex=False).to_numpy()
+        if op in ("in", "not_in"):
+            mask = pd.Series(column).isin(value).to_numpy()
+            return ~mask if op == "not_in" else mask
+        try:
+            if op == "eq":
+                return column == value
+            if op == "ne":
+                return column != value
+            if op == "between":
+                return (column >= value[0]) & (column <= value[1])
+            return {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}[op](column, value)
+        except TypeError as e:
+            raise QueryError(f"Cannot compare '{field}' with {value!r}: {e}")
+
+    def _matching_rows(self) -> np.ndarray:
+        driver = self._driver()
+        if driver is None:
+            rows = np.arange(len(self.analytics.df))
+            remaining = self.filters
+        else:
+            rows = driver[2]()
+            remaining = [f for f in self.filters if f is not driver[1]]
+        for f in remaining:
+            if not len(rows):
+                break
+            rows = rows[self._mask(f, rows)]
+        return rows
+
+    # ---------------- Results ----------------
+
+    def _sorted(self, rows: np.ndarray) -> np.ndarray:
+        if self.sort is None or not len(rows):
+            return rows
+        if self.sort["field"] == SALARY_COLUMN:
+            # Walk the salary-sorted index instead of sorting the matches
+            ordered = self.analytics.salary_order(descending=self.sort["desc"])
+            selected = np.zeros(len(self.analytics.df), dtype=bool)
+            selected[rows] = True
+            return ordered[selected[ordered]]
+        values = self.analytics.values(self.sort["field"])[rows]
+        if values.dtype == object:
+            # Rank the text, so descending is a stable sort too (ties keep row order)
+            _, values = np.unique(values.astype(str), return_inverse=True)
+        return rows[np.argsort(-values if self.sort["desc"] else values, kind="stable")]
+
+    def _grouped(self, rows: np.ndarray) -> pd.DataFrame:
+        """One row per group (or a single totals row), as a small DataFrame."""
+        index = self.analytics.group(self.group_by) if self.group_by is not None else None
+        if index is not None and all(a["op"] in ("count", "sum", "mean") for a in self.aggregates):
+            return self._grouped_codes(index, rows)
+        if self.group_by is not None:
+            keys = (pd.Categorical.from_codes(index.codes[rows], index.categories) if index is not None
+                    else self.analytics.values(self.group_by)[rows])
+        else:
+            keys = np.zeros(len(rows), dtype=np.int8)
+        columns = {"_key": keys}
+        for aggregate in self.aggregates:
+            if aggregate["field"] is not None:
+                columns[aggregate["field"]] = self.analytics.values(aggregate["field"])[rows]
+        grouped = pd.DataFrame(columns).groupby("_key", observed=True, sort=False)
+
+        result = pd.DataFrame(index=grouped.size().index)
+        for aggregate in self.aggregates:
+            name = self._aggregate_name(aggregate)
+            result[name] = grouped.size() if aggregate["op"] == "count" else grouped[aggregate["field"]].agg(aggregate["op"])
+        if self.group_by is None:
+            if result.empty:
+                result = pd.DataFrame([{self._aggregate_name(a): 0 if a["op"] == "count" else None
+                                        for a in self.aggregates}])
+            return result.reset_index(drop=True)
+        result = result.reset_index().rename(columns={"_key": self.group_by})
+        result[self.group_by] = result[self.group_by].astype(object)
+        if self.sort is not None:
+            return result.sort_values(self.sort["field"], ascending=not self.sort["desc"], kind="stable")
+        if "count" in result.columns:
+            return result.sort_values("count", ascending=False, kind="stable")
+        return result
+
+    def _grouped_codes(self, index, rows: np.ndarray) -> pd.DataFrame:
+        """count/sum/mean per category with bincount over the precomputed codes."""
+        codes = index.codes[rows]
+        valid = codes >= 0
+        codes, rows = codes[valid], rows[valid]
+        counts = np.bincount(codes, minlength=len(index.categories))
+        present = np.flatnonzero(counts)
+        result = pd.DataFrame({self.group_by: pd.Series([index.categories[c] for c in present], dtype=object)})
+        for aggregate in self.aggregates:
+            name = self._aggregate_name(aggregate)
+            if aggregate["op"] == "count":
+                result[name] = counts[present]
+                continue
+            values = self.analytics.values(aggregate["field"])[rows]
+            known = ~np.isnan(values)  # Skip missing values, like pandas
+            sums = np.bincount(codes[known], weights=values[known], minlength=len(index.categories))[present]
+            if aggregate["op"] == "sum":
+                result[name] = sums
+            else:
+                seen = np.bincount(codes[known], minlength=len(index.categories))[present]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    result[name] = np.where(seen > 0, sums / np.maximum(seen, 1), np.nan)
+        if self.sort is not None:
+            return result.sort_values(self.sort["field"], ascending=not self.sort["desc"], kind="stable")
+        if "count" in result.columns:
+            return result.sort_values("count", ascending=False, kind="stable")
+        return result
+
+    def _result(self):
+        """Matching rows (row positions) or the aggregate table, cached for paging."""
+        key = (id(self.analytics), self.digest)
+        result = _result_cache.get(key)
+        if result is None:
+            rows = self._matching_rows()
+            result = self._grouped(rows) if self.aggregates else self._sorted(rows)
+            _result_cache.put(key, result)
+        return result
+
+    def _records(self, result, start: int, stop: int) -> List[Dict[str, Any]]:
+        if isinstance(result, pd.DataFrame):
+            frame = result.iloc[start:stop]
+        else:
+            frame = self.analytics.take(result[start:stop], self.fields)
+        return [{k: _to_jsonable(v) for k, v in record.items()} for record in frame.to_dict(orient="records")]
+
+    # ---------------- Cursors ----------------
+
+    def _encode_cursor(self, offset: int) -> str:
+        raw = json.dumps({"o": offset, "q": self.digest}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> int:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset = int(data["o"])
+        except (ValueError, KeyError, TypeError):
+            raise QueryError("Malformed cursor")
+        if data.get("q") != self.digest or offset < 0:
+            raise QueryError("Cursor does not belong to this query")
+        return offset
+
+    def page(self, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of results.
+
+        Returns:
+            {rows, total, fields, next_cursor}; next_cursor is None on the last page
+        """
+        offset = self._decode_cursor(cursor) if cursor else 0
+        result = self._result()
+        stop = min(offset + self.limit, len(result))
+        return {
+            "rows": self._records(result, offset, stop),
+            "total": int(len(result)),
+            "fields": self.output_fields(),
+            "next_cursor": self._encode_cursor(stop) if stop < len(result) else None
+        }
+
+    def iter_records(self, batch: int = STREAM_BATCH) -> Iterator[List[Dict[str, Any]]]:
+        """Every result record, `batch` at a time (for streaming responses)."""
+        result = self._result()
+        for start in range(0, len(result), batch):
+            yield self._records(result, start, start + batch)
+
+    def total(self) -> int:
+        return int(len(self._result()))
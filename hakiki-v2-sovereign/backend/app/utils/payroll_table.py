@@ -0,0 +1,259 @@
+"""
+Shared Payroll Table for HAKIKI AI v2.0
+One read-only, compact payroll DataFrame per CSV, shared by reference between
+HakikiBrain, SovereignInvestigator and the analytics indexes instead of each
+reading the file again.
+
+Compaction: low-cardinality text columns (Ministry, Job_Group, ...) become
+categoricals and 64-bit integers are downcast to int32 where they fit. Floats
+stay float64 (money).
+
+Shared-memory mode (load_payroll(path, shared_name=...)): the first process
+publishes the compacted table to a named shared-memory segment and every other
+process (uvicorn workers, the Streamlit dashboard) attaches to it. Numeric and
+categorical columns are zero-copy views of the segment; free-text columns
+(names, IDs, PINs) are stored once as UTF-8 but decoded into each process.
+Shared frames are backed by read-only buffers: writing to them raises.
+
+Imported as backend.app.utils.payroll_table (brain.py at the project root).
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_MAX_RATIO = 0.5  # Text columns with unique values <= this share of rows become categoricals
+SHARED_WAIT_SECONDS = 30.0  # How long an attaching process waits for the publisher to finish writing
+
+_MAGIC = b"HKPAYRL1"
+_HEADER_SIZE = 16  # Magic + manifest length (0 until the segment is fully written)
+_ALIGN = 64
+
+_lock = threading.Lock()
+_tables: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}  # abspath -> (file stamp, frame)
+_segments: Dict[str, shared_memory.SharedMemory] = {}  # Kept open while their frames are in use
+
+
+def _file_stamp(path: str) -> Tuple[int, int]:
+    info = os.stat(path)
+    return info.st_mtime_ns, info.st_size
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+# ---------------- Compaction ----------------
+
+def compact_payroll(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals for repetitive text, int32 for integers that fit. Returns a new frame."""
+    rows = len(df)
+    columns = {}
+    for name, series in df.items():
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iu" and dtype.itemsize > 4 and rows:
+            info = np.iinfo(np.int32)
+            if info.min <= series.min() and series.max() <= info.max:
+                series = series.astype(np.int32)
+        elif _is_text(series) and rows and series.nunique(dropna=True) <= rows * CATEGORY_MAX_RATIO:
+            series = series.astype("category")
+        columns[name] = series
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+# ---------------- Shared-memory segments ----------------
+
+def segment_name(prefix: str, path: str) -> str:
+    """Segment for this version of the file (a changed CSV gets a fresh segment)."""
+    mtime_ns, size = _file_stamp(path)
+    digest = hashlib.sha1(f"{os.path.abspath(path)}|{mtime_ns}|{size}".encode()).hexdigest()[:10]
+    return f"{prefix}_{digest}"
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _encode(df: pd.DataFrame):
+    """(manifest, buffers): column layout with offsets relative to the data area, and their bytes."""
+    manifest: Dict[str, Any] = {"rows": len(df), "columns": []}
+    buffers = []
+    offset = 0
+
+    def add(array: np.ndarray) -> Dict[str, Any]:
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        entry = {"offset": offset, "dtype": array.dtype.str, "length": len(array)}
+        buffers.append((offset, array))
+        offset = _aligned(offset + array.nbytes)
+        return entry
+
+    for name, series in df.items():
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            manifest["columns"].append({
+                "name": name, "kind": "category", "codes": add(series.cat.codes.to_numpy()),
+                "categories": categories.tolist(), "categories_dtype": str(categories.dtype),
+                "ordered": bool(dtype.ordered)
+            })
+        elif isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            manifest["columns"].append({"name": name, "kind": "numeric", "values": add(series.to_numpy())})
+        else:
+            missing = series.isna().to_numpy()
+            texts = ["" if gone else str(value) for value, gone in zip(series.tolist(), missing)]
+            ends = np.cumsum([len(text) for text in texts], dtype=np.int64)
+            manifest["columns"].append({
+                "name": name, "kind": "text", "dtype": str(dtype),
+                "ends": add(ends), "missing": add(missing),
+                "chars": add(np.frombuffer("".join(texts).encode("utf-8"), dtype=np.uint8))
+            })
+    return manifest, buffers, offset
+
+
+def _view(segment: shared_memory.SharedMemory, data_start: int, entry: Dict[str, Any]) -> np.ndarray:
+    array = np.ndarray((entry["length"],), dtype=np.dtype(entry["dtype"]), buffer=segment.buf,
+                       offset=data_start + entry["offset"])
+    array.flags.writeable = False
+    return array
+
+
+def _decode(segment: shared_memory.SharedMemory, text_source: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Frame over the segment; `text_source` supplies already decoded text columns (the publisher's)."""
+    length = int.from_bytes(segment.buf[8:_HEADER_SIZE], "little")
+    manifest = json.loads(bytes(segment.buf[_HEADER_SIZE:_HEADER_SIZE + length]))
+    data_start = _aligned(_HEADER_SIZE + length)
+    columns = {}
+    for column in manifest["columns"]:
+        kind = column["kind"]
+        if kind == "numeric":
+            columns[column["name"]] = pd.Series(_view(segment, data_start, column["values"]), copy=False)
+        elif kind == "category":
+            categories = pd.Index(column["categories"], dtype=column["categories_dtype"])
+            values = pd.Categorical.from_codes(_view(segment, data_start, column["codes"]),
+                                               categories=categories, ordered=column["ordered"], validate=False)
+            columns[column["name"]] = pd.Series(values, copy=False)
+        elif text_source is not None:
+            columns[column["name"]] = text_source[column["name"]]
+        else:
+            text = _view(segment, data_start, column["chars"]).tobytes().decode("utf-8")
+            ends = _view(segment, data_start, column["ends"]).tolist()
+            missing = _view(segment, data_start, column["missing"]).tolist()
+            starts = [0] + ends[:-1]
+            values = [None if gone else text[start:end] for start, end, gone in zip(starts, ends, missing)]
+            columns[column["name"]] = pd.Series(values, dtype=column["dtype"])
+    return pd.DataFrame(columns, index=pd.RangeIndex(manifest["rows"]), copy=False)
+
+
+def publish_shared(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Write `df` to a new segment called `name` and return a frame backed by it.
+    Raises FileExistsError if another process already created the segment.
+    """
+    table = df.reset_index(drop=True)
+    manifest, buffers, data_size = _encode(table)
+    encoded = json.dumps(manifest).encode()
+    data_start = _aligned(_HEADER_SIZE + len(encoded))
+    segment = shared_memory.SharedMemory(name=name, create=True, size=max(data_start + data_size, 1))
+    for offset, array in buffers:
+        start = data_start + offset
+        segment.buf[start:start + array.nbytes] = array.view(np.uint8).reshape(-1)
+    segment.buf[_HEADER_SIZE:_HEADER_SIZE + len(encoded)] = encoded
+    segment.buf[0:8] = _MAGIC
+    segment.buf[8:_HEADER_SIZE] = len(encoded).to_bytes(8, "little")  # Written last: marks the segment ready
+    _segments[name] = segment
+    atexit.register(_release, name, True)
+    print(f"[PAYROLL] Published {len(df):,} rows to shared memory '{name}' ({segment.size / 1e6:.1f} MB)")
+    return _decode(segment, text_source=table)
+
+
+def attach_shared(name: str, wait: float = SHARED_WAIT_SECONDS) -> pd.DataFrame:
+    """
+    Frame backed by an existing segment (FileNotFoundError if there is none),
+    waiting up to `wait` seconds for its publisher to finish writing.
+    """
+    segment = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # Python < 3.13 tracks attached segments too and would unlink them when this process exits
+        resource_tracker.unregister(segment._name, "shared_memory")
+    deadline = time.monotonic() + wait
+    while int.from_bytes(segment.buf[8:_HEADER_SIZE], "little") == 0 or bytes(segment.buf[0:8]) != _MAGIC:
+        if time.monotonic() > deadline:
+            segment.close()
+            raise TimeoutError(f"Shared payroll segment '{name}' was never completed")
+        time.sleep(0.05)
+    _segments[name] = segment
+    atexit.register(_release, name, False)
+    df = _decode(segment)
+    print(f"[PAYROLL] Attached {len(df):,} rows from shared memory '{name}'")
+    return df
+
+
+def _release(name: str, unlink: bool):
+    segment = _segments.pop(name, None)
+    if segment is None:
+        return
+    try:
+        if unlink:
+            segment.unlink()  # Processes still attached keep their mapping
+        segment.close()
+    except (BufferError, OSError):
+        pass  # Frames still reference the buffer at interpreter exit; the OS reclaims it
+
+
+def _shared_table(path: str, prefix: str) -> pd.DataFrame:
+    name = segment_name(prefix, path)
+    try:
+        return attach_shared(name)
+    except FileNotFoundError:
+        pass
+    df = compact_payroll(pd.read_csv(path))
+    try:
+        return publish_shared(df, name)
+    except FileExistsError:
+        return attach_shared(name)  # Another worker published it first
+
+
+# ---------------- Entry point ----------------
+
+def load_payroll(path: str, shared_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    The compact payroll table for `path`, loaded once per process and file
+    version; callers share the same frame and must treat it as read-only.
+
+    With `shared_name` (a segment prefix), the table comes from shared memory,
+    published by whichever process gets there first. Falls back to a private
+    copy if shared memory is unavailable.
+    """
+    key = os.path.abspath(path)
+    stamp = _file_stamp(path)
+    with _lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        started = time.perf_counter()
+        df = None
+        if shared_name:
+            try:
+                df = _shared_table(path, shared_name)
+            except (OSError, TimeoutError, ValueError) as e:
+                print(f"[PAYROLL] Shared memory unavailable ({e}); using a private copy")
+        if df is None:
+            df = compact_payroll(pd.read_csv(path))
+        categorical = [name for name, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        print(f"[PAYROLL] {len(df):,} rows ready in {time.perf_counter() - started:.2f}s "
+              f"({memory_mb(df):.1f} MB; categorical: {', '.join(categorical) or 'none'})")
+        _tables[key] = (stamp, df)
+        return df
@@ -1,19 +1,24 @@
 import sys
 import os
 import pandas as pd
+import json
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 
 # Add parent directory to path to import investigator and brain
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# And backend/ itself, so the chat router shares app.services.llm_client (the LLM gateway)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from investigator import SovereignInvestigator
 from brain import HakikiBrain
 import backend.schemas as schemas
 import backend.security as security
 from backend.routers import audit
+from backend.app.utils.payroll_query import QueryError
 
 # INITIALIZE APP
 app = FastAPI(
@@ -45,6 +50,8 @@ async def startup_event():
     print("🚀 Initializing Sovereign Brain...")
     data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Hakiki_SRC_Data_v2.csv")
     brain_instance = HakikiBrain(payroll_path=data_path)
+    # Paraphrase matching in the chat response cache reuses the Vector DB's local embeddings
+    chat.chat_cache.embed = brain_instance.intel.ef
 
 # DEPENDENCY
 def get_brain():
@@ -103,7 +110,19 @@ async def agent_query(
             "intent": "BLOCKED"
         }
         
-    intent = brain.classify_intent(request.query)
+    # Structured queries (given, or planned from an analytics question) are paged
+    intent, spec = _plan_query(request, brain)
+    if spec is not None:
+        page = _run_page(brain, spec, request.cursor)
+        _log_audit(current_user, "QUERY_EXECUTION", request.query or "STRUCTURED", f"INTENT:{intent}")
+        return {
+            "trace": f"Intent Classified: {intent} (structured query, {page['total']} results)",
+            "result": page["rows"],
+            "intent": intent,
+            "plan": spec,
+            "total": page["total"],
+            "next_cursor": page["next_cursor"]
+        }
     
     # Execute (Reuse brain logic)
     # The brain.route_query returns (trace, result_dfs/str)
@@ -130,6 +149,61 @@ async def agent_query(
         "intent": intent
     }
 
+@app.post("/api/agent/query/stream")
+async def agent_query_stream(
+    request: schemas.QueryRequest,
+    current_user: str = Depends(security.get_current_user),
+    brain: HakikiBrain = Depends(get_brain)
+):
+    """
+    Full result set of a structured query as NDJSON: a header line
+    {"plan", "total", "fields"}, then one record per line, serialized in
+    batches so large results never sit in memory as one JSON document.
+    """
+    is_safe, msg = brain.check_security(request.query)
+    if not is_safe:
+        _log_audit(current_user, "QUERY_BLOCKED", request.query, "SECURITY_VIOLATION")
+        raise HTTPException(status_code=400, detail=msg)
+    intent, spec = _plan_query(request, brain)
+    if spec is None:
+        raise HTTPException(status_code=400, detail="Not a structured analytics query.")
+    query = _compile_query(brain, spec)
+    try:
+        total = query.total()
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _log_audit(current_user, "QUERY_STREAM", request.query or "STRUCTURED", f"INTENT:{intent}")
+
+    def lines():
+        yield json.dumps({"plan": spec, "total": total, "fields": query.output_fields()}) + "\n"
+        for batch in query.iter_records():
+            yield "".join(json.dumps(record, default=str) + "\n" for record in batch)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _plan_query(request: schemas.QueryRequest, brain: HakikiBrain):
+    """(intent, structured query spec or None) for an agent request."""
+    if request.structured is not None:
+        return "ANALYTICS", request.structured.model_dump(exclude_none=True)
+    intent = brain.classify_intent(request.query)
+    if intent != "ANALYTICS":
+        return intent, None
+    return intent, brain.plan_analytics(request.query)
+
+def _compile_query(brain: HakikiBrain, spec):
+    try:
+        return brain.compile_query(spec)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _run_page(brain: HakikiBrain, spec, cursor=None):
+    try:
+        return _compile_query(brain, spec).page(cursor)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ==================== INTEL ENDPOINTS ====================
 
 @app.post("/api/intel/tip")
@@ -165,4 +239,11 @@ def _log_audit(user, action, query, outcome):
 
 # Include Chat Router
 from backend.routers import chat
+from app.services.llm_client import ollama_client
+from app.services.audit_memory import audit_memory
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ollama_client.aclose()
+    audit_memory.flush()
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import pandas as pd
 import io
-import json
+
+# In-process audit findings (backend/ is on sys.path, see backend/main.py)
+from app.services.audit_memory import audit_memory
 
 router = APIRouter()
 
@@ -90,20 +92,15 @@ async def scan_payroll(file: UploadFile = File(...)):
             "suspects": top_suspects
         }
 
-        # 6. SAVE TO MEMORY
+        # 6. SAVE TO MEMORY (chat reads it in process; the JSON file is written in the background)
         memory_data = {
             "total_risk": float(total_risk),
             "ghost_count": len(duplicates),
             "allowance_count": len(allowance_fraud),
             "top_suspects": top_suspects
         }
-        
-        try:
-            with open("audit_memory.json", "w") as f:
-                json.dump(memory_data, f)
-            print("✅ [MEMORY SAVED] Findings stored.")
-        except Exception:
-            pass
+        version = audit_memory.update(memory_data)
+        print(f"✅ [MEMORY SAVED] Findings stored (version {version}).")
 
         return report
 
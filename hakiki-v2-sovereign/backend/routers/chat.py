@@ -1,86 +1,245 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import anyio
 import httpx
 import json
-import os
+
+# Shared LLM gateway and audit findings (backend/ is on sys.path, see backend/main.py)
+from app.core.config import settings
+from app.services.audit_memory import audit_memory
+from app.services.chat_cache import ChatResponseCache
+from app.services.llm_client import ollama_client, LLMQueueFullError, LLMUnavailableError, PRIORITY_INTERACTIVE
 
 router = APIRouter()
 
+CHAT_MODEL = "llama3.1"
+# INCREASED TIMEOUT to 120s for local LLM warm-up/loads (applies per chunk when streaming)
+OLLAMA_TIMEOUT = 120.0
+# Chat waits behind other generations longer than oracle calls do
+CHAT_QUEUE_TIMEOUT = 30.0
+
+# Sovereign System Prompt
+SYSTEM_PROMPT = (
+    "System: You are HAKIKI AI, a government forensic assistant. "
+    "You are deployed on a Sovereign Server (Air-Gapped). "
+    "Your mission is to detect fraud, analyze payroll data, and protect the public ledger. "
+    "Be professional, tactical, and concise. "
+    "Do not hallucinate. If you don't know, say 'Insufficient Intelligence'.\n"
+)
+
+# Replies to repeated questions, per audit findings version. Paraphrase matching is
+# off unless CHAT_CACHE_SIMILARITY > 0; its embedding function is set at startup
+# (backend/main.py) when the Vector DB loads.
+chat_cache = ChatResponseCache(
+    settings.CHAT_CACHE_SIZE, settings.CHAT_CACHE_TTL, similarity=settings.CHAT_CACHE_SIMILARITY
+)
+
 class ChatRequest(BaseModel):
     query: str
     context: str = ""
+    stream: bool = False  # True streams server-sent events; default is one JSON reply {"response": ...}
 
 @router.post("/ask")
 async def ask_ollama(request: ChatRequest):
+    """
+    Ask the sovereign model. Returns {"response": "..."} unless the request sets
+    "stream": true, in which case tokens stream back as server-sent events:
+        event: token  data: {"token": "..."}
+        event: done   data: {"done": true, "eval_count": ...}
+        event: error  data: {"detail": "..."}
+    Questions already answered for the current audit findings (or, with
+    embeddings on, close paraphrases of them) come from the response cache,
+    marked "cached": true.
+    If the client disconnects, Starlette cancels the stream and the model request
+    is closed, so Ollama stops generating.
+    """
     print("\n----- 🔵 NEW CHAT REQUEST RECEIVED -----")
     print(f"   👤 User Query: {request.query}")
     
     # 1. READ CONTEXT
-    print("📂 CHECKING MEMORY FILE...")
-    context_str = "No specific audit data available."
-    try:
-        if os.path.exists("audit_memory.json"):
-            print("   ✅ Found audit_memory.json")
-            with open("audit_memory.json", "r") as f:
-                data = json.load(f)
-                # Formulate a context summary from the JSON data
-                context_str = f"CURRENT AUDIT FINDINGS:\n- Total Risk: KES {data.get('total_risk', 0):,}\n- Ghost Workers: {data.get('ghost_count', 0)}\n- Allowance Fraud: {data.get('allowance_count', 0)}\n- Top Suspects: {', '.join(data.get('top_suspects', []))}"
-                print(f"   📄 Context Loaded: {len(context_str)} chars")
-        else:
-            print("   ⚠️ No memory file found.")
-    except Exception as e:
-        print(f"   ❌ ERROR READING FILE: {e}")
-
-    # 2. SEND TO OLLAMA
+    version, context_str = _load_context()
+
+    # 2. CHECK RESPONSE CACHE
+    reply = chat_cache.get(request.query, CHAT_MODEL, version, request.context)
+    if reply is None and chat_cache.semantic_enabled:
+        try:
+            reply = await anyio.to_thread.run_sync(
+                chat_cache.get_similar, request.query, CHAT_MODEL, version, request.context
+            )
+        except Exception as e:
+            print(f"   ⚠️ Semantic cache lookup failed: {e}")
+    if reply is not None:
+        print("   ⚡ CACHE HIT, SKIPPING OLLAMA.")
+        if request.stream:
+            return _cached_stream(reply)
+        return {"response": reply, "cached": True}
+
+    # 3. SEND TO OLLAMA
     print("🤖 CONTACTING OLLAMA BRAIN...")
-    ollama_url = "http://127.0.0.1:11434/api/generate"
-    
-    # Sovereign System Prompt
-    system_prompt = (
-        "System: You are HAKIKI AI, a government forensic assistant. "
-        "You are deployed on a Sovereign Server (Air-Gapped). "
-        "Your mission is to detect fraud, analyze payroll data, and protect the public ledger. "
-        "Be professional, tactical, and concise. "
-        "Do not hallucinate. If you don't know, say 'Insufficient Intelligence'.\n"
-    )
-    
+
     # Construct Payload
-    full_prompt = f"{system_prompt}\nSYSTEM INJECTED EVIDENCE: {context_str}\n\nUser: {request.query}\nContext: {request.context}"
-    
-    payload = {
-        "model": "llama3.1",
-        "prompt": full_prompt,
-        "stream": False
-    }
+    full_prompt = f"{SYSTEM_PROMPT}\nSYSTEM INJECTED EVIDENCE: {context_str}\n\nUser: {request.query}\nContext: {request.context}"
+
+    def remember(reply: str):
+        chat_cache.put(request.query, reply, CHAT_MODEL, version, request.context)
+
+    if request.stream:
+        return await _stream_reply(full_prompt, remember)
 
     try:
-        # INCREASED TIMEOUT to 120s for local LLM warm-up/loads
-        async with httpx.AsyncClient(timeout=120.0) as client: 
-            print("   📡 Sending Request to http://127.0.0.1:11434...")
-            response = await client.post(ollama_url, json=payload)
-            print("   ✅ OLLAMA RESPONDED!")
-            
-            if response.status_code != 200:
-                print(f"   ❌ OLLAMA ERROR CODE: {response.status_code} - {response.text}")
-                raise HTTPException(status_code=503, detail=f"Brain Malfunction: {response.text}")
-                
-            data = response.json()
-            reply = data.get("response", "No intelligence received.")
-            print("   📤 RETURNING RESPONSE TO FRONTEND.")
-            return {"response": reply}
-            
-    except httpx.ConnectError as exc:
+        print(f"   📡 Sending Request to {ollama_client.base_url}...")
+        reply = await ollama_client.generate(
+            CHAT_MODEL, full_prompt, timeout=OLLAMA_TIMEOUT,
+            priority=PRIORITY_INTERACTIVE, queue_timeout=CHAT_QUEUE_TIMEOUT
+        )
+        print("   ✅ OLLAMA RESPONDED!")
+    except LLMUnavailableError as exc:
+        raise _ollama_error(exc)
+
+    if reply:
+        await anyio.to_thread.run_sync(remember, reply)
+    print("   📤 RETURNING RESPONSE TO FRONTEND.")
+    return {"response": reply or "No intelligence received."}
+
+
+@router.get("/status")
+async def chat_status():
+    """Response cache hits and shared LLM gateway load."""
+    return {"cache": chat_cache.get_stats(), "llm": ollama_client.get_stats()}
+
+
+# (findings version, context string); rebuilt only when a new scan lands
+_context_cache = (None, "No specific audit data available.")
+
+
+def _load_context() -> tuple:
+    """(findings version, summary of the latest audit findings for the prompt)."""
+    global _context_cache
+    version, data = audit_memory.snapshot()
+    if _context_cache[0] == version:
+        return _context_cache
+
+    print("📂 REBUILDING AUDIT CONTEXT...")
+    context_str = "No specific audit data available."
+    if data is None:
+        print("   ⚠️ No audit findings in memory.")
+    else:
+        try:
+            # Formulate a context summary from the findings
+            context_str = f"CURRENT AUDIT FINDINGS:\n- Total Risk: KES {data.get('total_risk', 0):,}\n- Ghost Workers: {data.get('ghost_count', 0)}\n- Allowance Fraud: {data.get('allowance_count', 0)}\n- Top Suspects: {', '.join(data.get('top_suspects', []))}"
+            print(f"   📄 Context Loaded: {len(context_str)} chars (version {version})")
+        except Exception as e:
+            print(f"   ❌ ERROR READING FINDINGS: {e}")
+    _context_cache = (version, context_str)
+    return _context_cache
+
+    
+def _ollama_error(exc: Exception) -> HTTPException:
+    """Map a gateway or Ollama transport failure to the HTTP error the frontend expects."""
+    if isinstance(exc, LLMQueueFullError):
+        print(f"❌ GATEWAY QUEUE FULL: {str(exc)}")
+        return HTTPException(
+            status_code=429,
+            detail="Sovereign Brain busy. Too many requests queued, please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    if isinstance(exc, LLMUnavailableError):
+        if exc.__cause__ is None:
+            # Circuit open or no free slot in time
+            print(f"❌ OLLAMA UNAVAILABLE: {str(exc)}")
+            return HTTPException(status_code=503, detail=f"Sovereign Brain Unavailable: {str(exc)}")
+        if isinstance(exc.__cause__, httpx.HTTPStatusError):
+            print(f"❌ OLLAMA ERROR: {str(exc.__cause__)}")
+            return HTTPException(status_code=503, detail=f"Brain Malfunction: {str(exc.__cause__)}")
+        exc = exc.__cause__
+    if isinstance(exc, httpx.ConnectError):
         print(f"❌ OLLAMA CONNECTION FAILED: {str(exc)}")
-        raise HTTPException(
+        return HTTPException(
             status_code=503, 
             detail="Sovereign Brain Unreachable. Is Ollama running? (Try 'ollama serve')"
         )
-    except httpx.ReadTimeout:
+    if isinstance(exc, httpx.ReadTimeout):
         print("❌ OLLAMA TIMEOUT: Model took too long to think (>120s).")
-        raise HTTPException(
+        return HTTPException(
             status_code=504, 
             detail="Sovereign Brain Timeout. Model is warming up, please try again."
         )
-    except Exception as e:
-        print(f"❌ INTERNAL ERROR: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal Error: {str(e)}")
+    print(f"❌ INTERNAL ERROR: {str(exc)}")
+    return HTTPException(status_code=500, detail=f"Internal Error: {str(exc)}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _cached_stream(reply: str) -> StreamingResponse:
+    """A cached reply in the same SSE shape as a live one (one token event)."""
+    async def events():
+        yield _sse("token", {"token": reply})
+        yield _sse("done", {"done": True, "cached": True})
+
+    return _sse_response(events())
+
+
+async def _stream_reply(prompt: str, on_complete) -> StreamingResponse:
+    """
+    Open a streaming generation through the gateway and relay Ollama's NDJSON
+    chunks as SSE. Queue and connection errors are raised before the response
+    starts, so they keep their HTTP status codes. A fully streamed reply is
+    passed to on_complete (the response cache).
+    """
+    try:
+        print(f"   📡 Streaming Request to {ollama_client.base_url}...")
+        upstream = await ollama_client.open_stream(
+            CHAT_MODEL, prompt, timeout=OLLAMA_TIMEOUT,
+            priority=PRIORITY_INTERACTIVE, queue_timeout=CHAT_QUEUE_TIMEOUT
+        )
+    except LLMUnavailableError as exc:
+        raise _ollama_error(exc)
+
+    async def events():
+        tokens = 0
+        parts = []
+        finished = False
+        try:
+            async for chunk in upstream.chunks():
+                if chunk.get("error"):
+                    yield _sse("error", {"detail": f"Brain Malfunction: {chunk['error']}"})
+                    return
+                if chunk.get("response"):
+                    tokens += 1
+                    parts.append(chunk["response"])
+                    yield _sse("token", {"token": chunk["response"]})
+                if chunk.get("done"):
+                    finished = True
+                    yield _sse("done", {
+                        "done": True,
+                        "eval_count": chunk.get("eval_count"),
+                        "total_duration": chunk.get("total_duration")
+                    })
+                    return
+        except httpx.HTTPError as exc:
+            yield _sse("error", {"detail": _ollama_error(exc).detail})
+        finally:
+            # Closing the upstream connection is what tells Ollama to stop generating,
+            # and frees the gateway slot.
+            # Shielded: on disconnect this runs inside an already-cancelled task.
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()
+                if finished and parts:
+                    await anyio.to_thread.run_sync(on_complete, "".join(parts))
+            if finished:
+                print(f"   📤 STREAMED {tokens} CHUNKS TO FRONTEND.")
+            else:
+                print(f"   ⏹️ STREAM CLOSED EARLY AFTER {tokens} CHUNKS (client gone or error).")
+
+    return _sse_response(events())
@@ -41,13 +41,40 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+# Structured payroll query (see backend/app/utils/payroll_query.py)
+class QueryFilter(BaseModel):
+    field: str
+    op: str = "eq"  # eq, ne, in, not_in, gt, gte, lt, lte, between, contains
+    value: Any = None
+
+class QueryAggregate(BaseModel):
+    op: str  # count, sum, mean, min, max
+    field: Optional[str] = None
+
+class QuerySort(BaseModel):
+    field: str
+    desc: bool = False
+
+class StructuredQuery(BaseModel):
+    filters: List[QueryFilter] = []
+    group_by: Optional[str] = None
+    aggregates: List[QueryAggregate] = []
+    sort: Optional[QuerySort] = None
+    fields: Optional[List[str]] = None
+    limit: int = 20
+
 class QueryRequest(BaseModel):
-    query: str
+    query: str = ""
+    structured: Optional[StructuredQuery] = None  # Skips intent parsing
+    cursor: Optional[str] = None  # next_cursor from the previous page
 
 class QueryResponse(BaseModel):
     trace: str
     result: Any
     intent: str
+    plan: Optional[Dict[str, Any]] = None  # Structured query that produced the result
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class TipInput(BaseModel):
     content: str
@@ -0,0 +1,80 @@
+"""
+Payroll Name Index Benchmark for HAKIKI AI v2.0
+Compares the previous Full_Name.str.contains scan with PayrollNameIndex.resolve
+on a synthetic payroll (default 500,000 employees, Zipf-distributed names).
+
+Usage: python scripts/bench_name_index.py [employees] [lookups]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.name_index import PayrollNameIndex
+
+FIRST_NAMES = ["John", "Jane", "Peter", "Mary", "David", "Grace", "James", "Faith", "Brian", "Mercy",
+               "Kevin", "Esther", "Dennis", "Joyce", "Akinyi", "Chebet", "Wanjiru", "Kiprotich"]
+LAST_NAMES = ["Mwangi", "Ochieng", "Kamau", "Wanjiku", "Njoroge", "Otieno", "Wangari", "Kimani", "Nyambura",
+              "Ouma", "Odhiambo", "Kiplagat", "Cheruiyot", "Wafula", "Mutua", "Mathenge", "Karanja", "Korir"]
+SYLLABLES = ["ka", "ma", "wa", "nji", "ru", "ki", "mu", "ta", "chi", "eng", "nya", "bu", "ge", "the",
+             "dhi", "ko", "pla", "gat", "yo", "ti", "no", "ne", "sa", "ba", "ri", "go", "mo", "nda"]
+
+
+def synthetic_names(rng: random.Random, base, extra: int):
+    names = set(base)
+    while len(names) < len(base) + extra:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    return list(base) + sorted(names - set(base))
+
+
+def zipf_choice(names, n: int, seed: int):
+    weights = 1 / np.arange(1, len(names) + 1)
+    picks = np.random.default_rng(seed).choice(len(names), n, p=weights / weights.sum())
+    return [names[i] for i in picks]
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    rng = random.Random(7)
+
+    first = zipf_choice(synthetic_names(rng, FIRST_NAMES, 1_500), employees, seed=1)
+    last = zipf_choice(synthetic_names(rng, LAST_NAMES, 6_000), employees, seed=2)
+    df = pd.DataFrame({
+        "Employee_ID": [f"EMP-{i:06d}" for i in range(employees)],
+        "Full_Name": [f"{a} {b}" for a, b in zip(first, last)]
+    })
+    queries = [df["Full_Name"].iat[rng.randrange(employees)] for _ in range(lookups)]
+
+    start = time.perf_counter()
+    index = PayrollNameIndex()
+    index.load(df)
+    print(f"[BUILD] {time.perf_counter() - start:.2f}s for {employees:,} employees")
+
+    scans = queries[:max(lookups // 40, 1)]
+    start = time.perf_counter()
+    for name in scans:
+        df[df["Full_Name"].str.contains(name, case=False, na=False)]
+    contains_ms = (time.perf_counter() - start) / len(scans) * 1000
+    print(f"[CONTAINS] {contains_ms:.2f} ms per name ({len(scans)} names)")
+
+    timings = []
+    found = 0
+    for name in queries:
+        start = time.perf_counter()
+        matches = index.resolve(name)
+        timings.append(time.perf_counter() - start)
+        found += bool(matches) and matches[0]["full_name"] == name
+    timings = np.array(timings) * 1000
+    print(f"[INDEX] {timings.mean():.3f} ms mean, {np.percentile(timings, 50):.3f} ms p50, "
+          f"{np.percentile(timings, 99):.3f} ms p99 ({lookups:,} names)")
+    print(f"[INFO] Exact name ranked first: {found}/{lookups}, speed-up {contains_ms / timings.mean():.0f}x")
+
+
+if __name__ == "__main__":
+    main()
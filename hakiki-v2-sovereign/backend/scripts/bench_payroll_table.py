@@ -0,0 +1,167 @@
+"""
+Payroll Table Benchmark for HAKIKI AI v2.0
+Startup time and memory of the payroll data behind HakikiBrain + SovereignInvestigator
+on a synthetic payroll (default 500,000 employees):
+  before   - two pd.read_csv calls (brain and investigator each read the CSV)
+  private  - one compact table (load_payroll) shared by reference
+  shared   - workers attaching to a table published in shared memory
+Each mode runs in fresh processes; memory is the RSS / private (unshared) growth
+per process, from /proc/self/smaps_rollup. The five investigator checks must
+agree across modes.
+
+Usage: python scripts/bench_payroll_table.py [employees] [workers]
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from backend.app.utils.payroll_table import load_payroll, memory_mb
+
+MINISTRIES = [f"Ministry of {name}" for name in (
+    "Health", "Education", "Interior", "Defence", "Treasury", "Lands", "Energy", "Agriculture",
+    "Transport", "Water", "Trade", "Tourism", "Labour", "ICT", "Environment", "Mining",
+    "Foreign Affairs", "Youth", "Sports", "Devolution")]
+JOB_GROUPS = ["J", "K", "L", "M", "N", "P"]
+BANKS = ["Equity Bank", "KCB", "Co-op Bank", "NCBA", "Family Bank"]
+CHECKS = ["validate_kra_format", "hunt_ghost_families", "hunt_double_dippers",
+          "hunt_grade_inflation", "hunt_allowance_sharks"]
+
+
+def synthetic_payroll(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    py = random.Random(seed)
+    ids = rng.integers(20_000_000, 40_000_000, n)
+    ids[:n // 100] = ids[n // 100:2 * (n // 100)]  # Double dippers
+    accounts = rng.integers(1_000_000_000, 9_999_999_999, n)
+    accounts[:15] = 111222333444  # Ghost family
+    basic = rng.integers(33_000, 280_000, n)
+    special = np.where(rng.random(n) < 0.01, basic * 2, 0)
+    house = rng.choice([10_000, 16_500, 25_000, 35_000, 45_000, 60_000], n)
+    pins = [f"{py.choice('AP')}{py.randrange(10 ** 9):09d}{py.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}" for _ in range(n)]
+    for i in range(0, n, 997):
+        pins[i] = pins[i][:-1]  # Malformed PINs
+    return pd.DataFrame({
+        "National_ID": ids.astype(str),
+        "Full_Name": [f"Employee_{i}" for i in range(n)],
+        "Ministry": rng.choice(MINISTRIES, n),
+        "Department": [f"Department {d}" for d in rng.integers(0, 120, n)],
+        "Job_Group": rng.choice(JOB_GROUPS, n, p=[0.3, 0.3, 0.2, 0.1, 0.05, 0.05]),
+        "Basic_Salary": basic,
+        "House_Allowance": house,
+        "Special_Allowance": special,
+        "Gross_Pay": basic + house + special,
+        "Bank_Name": rng.choice(BANKS, n),
+        "Bank_Account_No": accounts.astype(str),
+        "KRA_PIN": pins,
+    })
+
+
+def memory_kb() -> dict:
+    """RSS and private (not shared with other processes) memory of this process, in kB."""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Private_Clean", "Private_Dirty"):
+                usage[key] = int(value.split()[0])
+    return {"rss": usage["Rss"], "private": usage["Private_Clean"] + usage["Private_Dirty"]}
+
+
+def child(mode: str, csv_path: str, prefix: str):
+    """One process as the API/dashboard starts it: load, then run the five checks."""
+    from investigator import SovereignInvestigator
+
+    before = memory_kb()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "before":
+            brain_df = pd.read_csv(csv_path)
+            investigator = SovereignInvestigator.__new__(SovereignInvestigator)
+            investigator.df, investigator.results = pd.read_csv(csv_path), {}
+        else:
+            brain_df = load_payroll(csv_path, shared_name=prefix if mode == "shared" else None)
+            investigator = SovereignInvestigator(csv_path, df=brain_df)
+    load_seconds = time.perf_counter() - started
+    after = memory_kb()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {check: int(getattr(investigator, check)()) for check in CHECKS}
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "checks_seconds": time.perf_counter() - started,
+        "rss_mb": (after["rss"] - before["rss"]) / 1024,
+        "private_mb": (after["private"] - before["private"]) / 1024,
+        "frame_mb": memory_mb(brain_df) + (0 if investigator.df is brain_df else memory_mb(investigator.df)),
+        "results": results
+    }))
+
+
+def run_children(mode: str, csv_path: str, prefix: str, workers: int) -> list:
+    procs = [subprocess.Popen([sys.executable, __file__, "--child", mode, csv_path, prefix],
+                              stdout=subprocess.PIPE, text=True, cwd=PROJECT_DIR) for _ in range(workers)]
+    reports = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f"{mode} worker failed")
+        reports.append(json.loads(out.strip().splitlines()[-1]))
+    return reports
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+        return
+
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"[BENCH] {employees:,} employees, {workers} worker processes per mode")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "payroll.csv")
+        synthetic_payroll(employees).to_csv(csv_path, index=False)
+        print(f"[BENCH] CSV: {os.path.getsize(csv_path) / 1e6:.1f} MB")
+        prefix = f"hakiki_bench_{os.getpid()}"
+
+        summary = {}
+        for mode in ("before", "private", "shared"):
+            if mode == "shared":
+                # The publisher (first worker / API process) holds the segment while the others attach
+                with contextlib.redirect_stdout(io.StringIO()):
+                    load_payroll(csv_path, shared_name=prefix)
+            reports = run_children(mode, csv_path, prefix, workers)
+            summary[mode] = reports
+            load = np.mean([r["load_seconds"] for r in reports])
+            rss = np.mean([r["rss_mb"] for r in reports])
+            private = np.mean([r["private_mb"] for r in reports])
+            checks = np.mean([r["checks_seconds"] for r in reports])
+            print(f"[{mode.upper():7}] load {load:.2f}s | RSS +{rss:.0f} MB | private +{private:.0f} MB "
+                  f"per process | frames {reports[0]['frame_mb']:.0f} MB | checks {checks:.2f}s")
+
+        results = {json.dumps(r["results"], sort_keys=True) for reports in summary.values() for r in reports}
+        print(f"[BENCH] Investigator results agree across modes: {len(results) == 1} "
+              f"{summary['before'][0]['results']}")
+        base = summary["before"]
+        for mode in ("private", "shared"):
+            load = np.mean([r["load_seconds"] for r in base]) / np.mean([r["load_seconds"] for r in summary[mode]])
+            private = np.mean([r["private_mb"] for r in base]) / max(
+                np.mean([r["private_mb"] for r in summary[mode]]), 1e-9)
+            print(f"   {mode}: startup {load:.1f}x faster, {private:.1f}x less private memory per process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Sentinel FFT Micro-Benchmark for HAKIKI AI v2.0
+Compares the original liveness path (full decode, complex fft2, fresh mask)
+with the fast path (draft JPEG decode, float32 rfft2, cached mask).
+Reports per-image latency, peak traced allocations and energy agreement.
+
+Usage: python scripts/bench_sentinel_fft.py [num_images] [width] [height]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.sentinel_fog import SentinelFogNode
+
+
+def legacy_energy(image_bytes: bytes) -> float:
+    """The pre-fast-path `_analyze_fourier_spectrum`, kept verbatim as the reference."""
+    img = Image.open(io.BytesIO(image_bytes)).convert('L')
+    img = img.resize((256, 256))
+    img_array = np.array(img)
+    f = np.fft.fft2(img_array)
+    fshift = np.fft.fftshift(f)
+    magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
+    rows, cols = magnitude_spectrum.shape
+    crow, ccol = rows // 2, cols // 2
+    mask_size = 30
+    magnitude_spectrum[crow-mask_size:crow+mask_size, ccol-mask_size:ccol+mask_size] = 0
+    return float(np.mean(magnitude_spectrum))
+
+
+def make_photo(width: int, height: int, seed: int, moire: bool = False) -> bytes:
+    """Synthetic phone photo: smooth gradient + sensor noise, optional screen grid."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = 128 + 60 * np.sin(x / width * 3.0) * np.cos(y / height * 2.0)
+    if moire:
+        base = base + 40 * np.sin(x * 0.9) * np.sin(y * 0.9)
+    rgb = np.clip(base[..., None] + rng.normal(0, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def measure(fn, images):
+    """Mean latency (ms) and peak traced allocation (MB) per image."""
+    fn(images[0])  # warm caches (mask weights, FFT twiddles)
+
+    start = time.perf_counter()
+    values = [fn(img) for img in images]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(images)
+
+    tracemalloc.start()
+    fn(images[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.array(values), latency_ms, peak / 1e6
+
+
+def main():
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 3000
+
+    print(f"[INFO] Generating {num_images} synthetic {width}x{height} JPEGs...")
+    images = [make_photo(width, height, seed=i, moire=(i % 4 == 0)) for i in range(num_images)]
+
+    node = SentinelFogNode()
+    fast = lambda b: float(node._batch_high_freq_energy(node._decode_greyscale(b)[np.newaxis])[0])
+
+    legacy_vals, legacy_ms, legacy_mb = measure(legacy_energy, images)
+    fast_vals, fast_ms, fast_mb = measure(fast, images)
+
+    diff = np.abs(fast_vals - legacy_vals)
+    same_verdict = np.mean((fast_vals > node.SPOOF_THRESHOLD) == (legacy_vals > node.SPOOF_THRESHOLD))
+
+    print(f"\n{'='*56}")
+    print(f"{'Path':<12}{'ms/image':>12}{'peak alloc MB':>16}{'mean energy':>16}")
+    print(f"{'-'*56}")
+    print(f"{'legacy':<12}{legacy_ms:>12.2f}{legacy_mb:>16.2f}{legacy_vals.mean():>16.3f}")
+    print(f"{'fast':<12}{fast_ms:>12.2f}{fast_mb:>16.2f}{fast_vals.mean():>16.3f}")
+    print(f"{'='*56}")
+    print(f"Speed-up:            {legacy_ms / fast_ms:.1f}x")
+    print(f"Energy |diff| max:   {diff.max():.3f} (mean {diff.mean():.3f})")
+    print(f"Relative diff max:   {(diff / np.maximum(legacy_vals, 1e-9)).max() * 100:.2f}%")
+    print(f"Verdict agreement:   {same_verdict * 100:.1f}% (threshold {node.SPOOF_THRESHOLD})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+LLM Load Test for HAKIKI AI v2.0
+Closed-loop virtual users hit the chat (/api/chat/ask, streamed) and oracle
+(/api/v1/audit/oracle) endpoints for a fixed duration and report throughput,
+error rates and latency percentiles per endpoint, plus the LLM gateway's queue
+metrics.
+
+By default both apps run in process (httpx ASGI transport, so chat streams
+arrive in one piece and time-to-first-token equals total time) against an
+Ollama stand-in started on a free port. Pass --chat-url/--oracle-url to test
+running servers, and --ollama-url to use an existing model server instead.
+
+Usage: python scripts/load_test_llm.py [--users 16] [--duration 20] [--chat-share 0.3]
+           [--latency-ms 300] [--tokens-per-sec 40] [--fail-rate 0.0] [--parallel 4]
+           [--repeat 0.0]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))  # Project root, for backend.routers.chat
+
+from scripts.ollama_standin import make_server, parse_args as standin_args
+
+CHAT_QUESTIONS = ["What is the total risk?", "How many ghost workers did the audit find?",
+                  "Who are the top suspects?", "Summarize the allowance fraud findings."]
+TIPS = ["John Kamau in the Ministry of Health has not reported to work for months but still gets paid.",
+        "The procurement officer at Treasury inflated the tender for laptops and took a kickback.",
+        "Mary Wanjiku's house allowance is twice her basic salary.",
+        "Three employees at Lands share one bank account."]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the chat and oracle LLM paths")
+    parser.add_argument("--users", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--chat-share", type=float, default=0.3, help="Fraction of requests that are chat")
+    parser.add_argument("--repeat", type=float, default=0.0,
+                        help="Fraction of repeated questions/tips (served by the response caches)")
+    parser.add_argument("--chat-url", default=None, help="Running project-root API (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--oracle-url", default=None, help="Running app.main API (e.g. http://127.0.0.1:8001)")
+    parser.add_argument("--ollama-url", default=None, help="Use this model server instead of the stand-in")
+    # Stand-in behaviour
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def start_standin(args: argparse.Namespace) -> str:
+    config = standin_args([
+        "--port", "0", "--latency-ms", str(args.latency_ms), "--tokens-per-sec", str(args.tokens_per_sec),
+        "--tokens", str(args.tokens), "--parallel", str(args.parallel), "--fail-rate", str(args.fail_rate),
+        "--hang-rate", str(args.hang_rate), "--seed", "7"
+    ])
+    server = make_server(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def make_clients(args: argparse.Namespace):
+    """(chat client, oracle client); in-process apps unless URLs were given."""
+    timeout = httpx.Timeout(180.0)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    if args.chat_url:
+        chat = httpx.AsyncClient(base_url=args.chat_url, timeout=timeout, limits=limits)
+    else:
+        from fastapi import FastAPI
+        from backend.routers import chat as chat_router
+        chat_app = FastAPI()
+        chat_app.include_router(chat_router.router, prefix="/api/chat")
+        chat = httpx.AsyncClient(transport=httpx.ASGITransport(app=chat_app), base_url="http://chat", timeout=timeout)
+    if args.oracle_url:
+        oracle = httpx.AsyncClient(base_url=args.oracle_url, timeout=timeout, limits=limits)
+    else:
+        from app.main import app as oracle_app
+        oracle = httpx.AsyncClient(transport=httpx.ASGITransport(app=oracle_app), base_url="http://oracle",
+                                   timeout=timeout)
+    return chat, oracle
+
+
+class Results:
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.first_token = []
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.oracle_sources = defaultdict(int)
+
+
+async def chat_request(client: httpx.AsyncClient, query: str, results: Results):
+    started = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/api/chat/ask", json={"query": query, "stream": True}) as response:
+        async for line in response.aiter_lines():
+            if first is None and line.startswith("event: token"):
+                first = time.perf_counter() - started
+            if line.startswith("event: error"):
+                results.statuses["chat"]["stream_error"] += 1
+                return
+    results.statuses["chat"][response.status_code] += 1
+    if response.status_code == 200:
+        results.latency["chat"].append(time.perf_counter() - started)
+        if first is not None:
+            results.first_token.append(first)
+
+
+async def oracle_request(client: httpx.AsyncClient, tip: str, results: Results):
+    started = time.perf_counter()
+    response = await client.post("/api/v1/audit/oracle", json={"text": tip})
+    results.statuses["oracle"][response.status_code] += 1
+    if response.status_code == 200:
+        results.latency["oracle"].append(time.perf_counter() - started)
+        results.oracle_sources[response.json().get("analysis_type", "UNKNOWN")] += 1
+
+
+async def virtual_user(user: int, args, chat, oracle, deadline: float, results: Results):
+    rng = random.Random(user)
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        repeat = rng.random() < args.repeat
+        suffix = "" if repeat else f" (ref {user}-{n})"
+        try:
+            if rng.random() < args.chat_share:
+                await chat_request(chat, rng.choice(CHAT_QUESTIONS) + suffix, results)
+            else:
+                await oracle_request(oracle, rng.choice(TIPS) + suffix, results)
+        except httpx.HTTPError as e:
+            results.statuses["transport"][type(e).__name__] += 1
+
+
+def percentiles(values) -> str:
+    if not values:
+        return "no successful requests"
+    ms = np.array(values) * 1000
+    return (f"p50 {np.percentile(ms, 50):.0f} ms, p95 {np.percentile(ms, 95):.0f} ms, "
+            f"p99 {np.percentile(ms, 99):.0f} ms, max {ms.max():.0f} ms")
+
+
+async def run(args: argparse.Namespace):
+    chat, oracle = make_clients(args)
+    results = Results()
+    print(f"[LOAD] {args.users} users for {args.duration:g}s, {args.chat_share:.0%} chat, "
+          f"{args.repeat:.0%} repeated questions")
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*[virtual_user(u, args, chat, oracle, deadline, results) for u in range(args.users)])
+    elapsed = time.perf_counter() - started
+    await chat.aclose()
+    await oracle.aclose()
+
+    for endpoint in ("chat", "oracle"):
+        ok = len(results.latency[endpoint])
+        total = sum(results.statuses[endpoint].values())
+        print(f"[{endpoint.upper()}] {total} requests, {ok / elapsed:.1f} ok/s, "
+              f"statuses {dict(results.statuses[endpoint])}")
+        print(f"   latency: {percentiles(results.latency[endpoint])}")
+        if endpoint == "chat" and results.first_token:
+            print(f"   first token: {percentiles(results.first_token)}")
+        if endpoint == "oracle" and results.oracle_sources:
+            print(f"   analyses by source: {dict(results.oracle_sources)}")
+    if results.statuses["transport"]:
+        print(f"[TRANSPORT] {dict(results.statuses['transport'])}")
+    if not (args.chat_url and args.oracle_url):
+        from app.services.llm_client import ollama_client
+        stats = ollama_client.get_stats()
+        print(f"[GATEWAY] {stats.get('queue')}")
+        print(f"   circuit {stats['circuit']}, busy {stats['busy']}, rejected {stats['rejected']}, "
+              f"failed {stats['failed']}")
+
+
+def main():
+    args = parse_args()
+    ollama_url = args.ollama_url or start_standin(args)
+    # Must be set before the app modules read their settings
+    os.environ["OLLAMA_URL"] = ollama_url
+    print(f"[LOAD] Model server: {ollama_url}{'' if args.ollama_url else ' (stand-in)'}")
+    asyncio.run(run(args))
+    if not args.ollama_url:
+        stats = httpx.get(ollama_url + "/standin/stats").json()
+        stats.pop("config", None)
+        print(f"[STANDIN] {stats}")
+
+
+if __name__ == "__main__":
+    main()
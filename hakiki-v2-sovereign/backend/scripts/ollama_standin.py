@@ -0,0 +1,231 @@
+"""
+Ollama Stand-in Server for HAKIKI AI v2.0
+Implements the parts of Ollama's HTTP API the backend uses (/api/generate with
+streaming NDJSON or one JSON reply, format="json", /api/tags, /api/version),
+with configurable latency, token rate, parallelism and failure injection, so the
+chat and oracle LLM paths can be load-tested without a model server.
+Standard library only (runs on air-gapped build machines).
+
+Usage: python scripts/ollama_standin.py [--port 11434] [--latency-ms 300] [--tokens-per-sec 40]
+           [--tokens 60] [--parallel 4] [--fail-rate 0.0] [--hang-rate 0.0] [--hang-seconds 300]
+
+Point the backend at it with OLLAMA_URL=http://127.0.0.1:<port>. GET /standin/stats
+shows what it served.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ["payroll", "audit", "ghost", "worker", "allowance", "ministry", "risk", "KES", "flagged",
+         "employee", "duplicate", "bank", "account", "records", "show", "the", "of", "and", "in", "a"]
+FRAUD_TYPES = ["GHOST_WORKER", "ALLOWANCE_FRAUD", "NEPOTISM", "PROCUREMENT_FRAUD", "BRIBERY"]
+DEPARTMENTS = ["Ministry of Health", "Ministry of Education", "Treasury", "Interior", "Lands"]
+NAMES = ["John Kamau", "Mary Wanjiku", "Peter Ochieng", "Grace Otieno", "David Kiplagat"]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ollama /api/generate stand-in for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Time to first token (prompt eval)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative +/- jitter on latency and token gaps")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens per free-text reply")
+    parser.add_argument("--parallel", type=int, default=4, help="Like OLLAMA_NUM_PARALLEL; extra requests queue")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction answered with HTTP 500")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction that stall before replying")
+    parser.add_argument("--hang-seconds", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+class StandinState:
+    """Shared config, model slots and counters for all handler threads."""
+
+    def __init__(self, config: argparse.Namespace):
+        self.config = config
+        self.slots = threading.Semaphore(max(config.parallel, 1))
+        self.random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "in_flight": 0, "queued": 0, "completed": 0,
+                      "failed": 0, "hung": 0, "client_gone": 0}
+
+    def count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def roll(self) -> float:
+        with self._lock:
+            return self.random.random()
+
+    def jittered(self, seconds: float) -> float:
+        jitter = self.config.jitter
+        return max(seconds * (1 + (self.roll() * 2 - 1) * jitter), 0.0)
+
+
+def reply_tokens(prompt: str, json_format: bool, tokens: int):
+    """Deterministic reply for a prompt, split into stream-sized pieces."""
+    seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    if json_format:
+        text = json.dumps({
+            "Person": rng.choice(NAMES),
+            "Dept": rng.choice(DEPARTMENTS),
+            "Fraud Type": rng.choice(FRAUD_TYPES),
+            "risk_score": rng.randint(40, 95)
+        })
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    return [rng.choice(WORDS) + " " for _ in range(tokens)]
+
+
+def make_handler(state: StandinState):
+    config = state.config
+
+    class GenerateHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _chunk(self, body: dict):
+            line = (json.dumps(body) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/version":
+                self._json(200, {"version": "0.0.0-standin"})
+            elif self.path == "/api/tags":
+                self._json(200, {"models": [{"name": "llama3:latest"}, {"name": "llama3.1:latest"}]})
+            elif self.path == "/standin/stats":
+                self._json(200, {**state.stats, "config": vars(config)})
+            elif self.path == "/":
+                data = b"Ollama is running"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self._json(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError:
+                self._json(400, {"error": "invalid JSON body"})
+                return
+            if not body.get("model"):
+                self._json(400, {"error": "model is required"})
+                return
+
+            state.count("requests")
+            state.count("queued")
+            with state.slots:
+                state.count("queued", -1)
+                state.count("in_flight")
+                try:
+                    self._generate(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    state.count("client_gone")
+                finally:
+                    state.count("in_flight", -1)
+
+        def _generate(self, body: dict):
+            started = time.perf_counter()
+            roll = state.roll()
+            if roll < config.fail_rate:
+                state.count("failed")
+                time.sleep(state.jittered(config.latency_ms / 1000) / 4)
+                self._json(500, {"error": "stand-in injected failure"})
+                return
+            if roll < config.fail_rate + config.hang_rate:
+                state.count("hung")
+                time.sleep(config.hang_seconds)
+
+            pieces = reply_tokens(str(body.get("prompt", "")), body.get("format") == "json", config.tokens)
+            gap = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+            time.sleep(state.jittered(config.latency_ms / 1000))
+            prompt_done = time.perf_counter()
+
+            def final(response: str) -> dict:
+                now = time.perf_counter()
+                return {
+                    "model": body["model"],
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": response,
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": int((now - started) * 1e9),
+                    "load_duration": 0,
+                    "prompt_eval_count": len(str(body.get("prompt", "")).split()),
+                    "prompt_eval_duration": int((prompt_done - started) * 1e9),
+                    "eval_count": len(pieces),
+                    "eval_duration": int((now - prompt_done) * 1e9)
+                }
+
+            if not body.get("stream", True):
+                time.sleep(state.jittered(gap * len(pieces)))
+                self._json(200, final("".join(pieces)))
+                state.count("completed")
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in pieces:
+                self._chunk({
+                    "model": body["model"],
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": piece,
+                    "done": False
+                })
+                time.sleep(state.jittered(gap))
+            self._chunk(final(""))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            state.count("completed")
+
+    return GenerateHandler
+
+
+def make_server(config: argparse.Namespace) -> ThreadingHTTPServer:
+    """Bound server (not yet serving); port 0 picks a free port (see server_address)."""
+    server = ThreadingHTTPServer((config.host, config.port), make_handler(StandinState(config)))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    config = parse_args()
+    server = make_server(config)
+    host, port = server.server_address[:2]
+    print(f"[STANDIN] Ollama stand-in on http://{host}:{port} "
+          f"({config.latency_ms:.0f} ms first token, {config.tokens_per_sec:g} tok/s, {config.parallel} parallel, "
+          f"fail {config.fail_rate:.0%}, hang {config.hang_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ from chromadb.utils import embedding_functions
 import uuid
 import os
 
+from backend.app.utils.name_index import PayrollNameIndex
+
 # CONFIG
 VECTOR_DB_PATH = "./hakiki_vectors"
 
@@ -28,6 +30,10 @@ class WhistleblowerBrain:
             embedding_function=self.ef
         )
         print(f"[INTEL] Vector DB initialized. Tips stored: {self.collection.count()}")
+        
+        # Payroll name index, rebuilt only when a different DataFrame is passed in
+        self._name_index = PayrollNameIndex()
+        self._name_index_df = None
 
     def add_tip(self, text, source="Anonymous", employee_name=None, ministry=None):
         """
@@ -90,7 +96,7 @@ class WhistleblowerBrain:
             "count": len(results.get("documents", [[]])[0])
         }
 
-    def correlate_with_payroll(self, payroll_df, suspect_name):
+    def correlate_with_payroll(self, payroll_df, suspect_name, limit=None):
         """
         Checks if a named suspect exists in Payroll data.
         Uses fuzzy matching on Full_Name column.
@@ -98,21 +104,31 @@ class WhistleblowerBrain:
         Args:
             payroll_df: Pandas DataFrame with payroll data
             suspect_name: Name to search for
+            limit: None (default) returns every case-insensitive partial match on
+                Full_Name. A number returns at most that many fuzzy candidates
+                instead (spelling variants too), best first, each with a Match_Score.
             
         Returns:
             List of matching employee records
         """
         if payroll_df is None or payroll_df.empty:
             return []
-            
-        # Case-insensitive partial match
-        match = payroll_df[
-            payroll_df['Full_Name'].str.contains(suspect_name, case=False, na=False)
-        ]
         
-        if not match.empty:
-            return match.to_dict(orient='records')
-        return []
+        # Index built once per payroll DataFrame (trigram + phonetic name index)
+        if self._name_index_df is not payroll_df:
+            self._name_index.load(payroll_df)
+            self._name_index_df = payroll_df
+        
+        if limit is None:
+            # Case-insensitive partial match, from the index instead of a Full_Name scan
+            rows = self._name_index.containing(suspect_name)
+            return payroll_df.iloc[rows].to_dict(orient='records')
+        
+        matches = self._name_index.resolve(suspect_name, limit=limit)
+        records = payroll_df.iloc[[m["row"] for m in matches]].to_dict(orient='records')
+        for record, m in zip(records, matches):
+            record["Match_Score"] = m["score"]
+        return records
 
     def get_stats(self):
         """Returns statistics about the intelligence database."""
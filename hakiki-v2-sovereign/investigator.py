@@ -2,9 +2,10 @@
 # HAKIKI AI v2 - Sovereign Investigator
 # Deterministic fraud detection based on Kenyan payroll laws (SRC Circulars)
 
-import pandas as pd
 import re
 
+from backend.app.utils.payroll_table import load_payroll
+
 # --- SRC RULES (The Law) ---
 SRC_CEILINGS = {
     "J": 56000, 
@@ -26,10 +27,11 @@ class SovereignInvestigator:
     5. Allowance Sharks (special allowance > basic)
     """
     
-    def __init__(self, filepath):
-        self.df = pd.read_csv(filepath)
+    def __init__(self, filepath=None, df=None):
+        # Pass `df` to share an already loaded payroll table (read-only) instead of reading the CSV again
+        self.df = df if df is not None else load_payroll(filepath)
         self.results = {}
-        print(f"📂 Loaded {len(self.df)} records from {filepath}")
+        print(f"📂 Loaded {len(self.df)} records from {filepath or 'shared payroll table'}")
         print(f"   Ministries: {self.df['Ministry'].unique().tolist()}")
 
     def validate_kra_format(self):